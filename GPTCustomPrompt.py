@@ -1,38 +1,34 @@
 import os
 import textwrap
-from langchain.vectorstores import FAISS
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.chat_models import ChatOpenAI
-from langchain.chains.qa_with_sources import load_qa_with_sources_chain
-from dotenv import load_dotenv
-
-# Load .env file
-load_dotenv()
-
-# Load API Key
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+import shared_resources
+from metrics import timed, span
+from retrieval import filtered_search, VALID_SOURCES
+from context_packer import pack_context
+from response_cache import get_response_cache, doc_ids
+from semantic_cache import get_semantic_cache, profile_bucket
 
 class GPTCustomPromptPlanner:
-    def __init__(self, vector_path="vector", model_name="gpt-4-turbo", temperature=0.4):
+    def __init__(self, vector_path="vector", model_name="gpt-4-turbo", temperature=0.4, semantic_cache=None):
+        shared_resources.load_env()
         if not os.environ.get("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY not set in environment.")
         self.vector_path = vector_path
         self.model_name = model_name
         self.temperature = temperature
+        self.semantic_cache = semantic_cache or get_semantic_cache()
         self._load_vectorstore()
         self._load_model()
 
     def _load_vectorstore(self):
-        embeddings = OpenAIEmbeddings()
-        self.vectorstore = FAISS.load_local(
-            self.vector_path,
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
+        # Loaded once per process and shared; hot-reloaded when the vector directory changes
+        shared_resources.get_vectorstore(self.vector_path)
+
+    @property
+    def vectorstore(self):
+        return shared_resources.get_vectorstore(self.vector_path)
 
     def _load_model(self):
-        self.llm = ChatOpenAI(model_name=self.model_name, temperature=self.temperature)
-        self.chain = load_qa_with_sources_chain(self.llm, chain_type="stuff")
+        self.llm, self.chain = shared_resources.get_chain(self.model_name, self.temperature)
 
     def enrich_prompt(self, user_prompt, age, gender, height_cm, present_weight, target_weight, calories):
         goal = "gain" if target_weight > present_weight else "lose"
@@ -58,16 +54,21 @@ User wants to {goal} weight. Answer the following question using the provided co
    *"This question appears unrelated to personalized health guidance. Please ask about nutrition, exercise, or weight-related planning."*
 """
 
-    def generate(self, user_prompt, age, gender, height_cm, present_weight, target_weight, calories, score_threshold=0.5):
-        docs_and_scores = self.vectorstore.similarity_search_with_score(user_prompt, k=7)
+    @timed("chat.embed")
+    def embed(self, user_prompt):
+        return self.vectorstore.embedding_function.embed_query(user_prompt)
 
-        valid_sources = { "diet", "physical", "Weight", "GymDataset", "weight_gain", "weight_loss","Human_Nut","Nut_Science"}
+    @timed("chat.retrieve")
+    def retrieve(self, user_prompt, score_threshold=0.5, embedding=None):
+        if embedding is None:
+            embedding = self.embed(user_prompt)
+        # Source and score filters run inside the index instead of discarding hits afterwards
+        with span("chat.faiss_search"):
+            filtered = filtered_search(self.vectorstore, embedding, k=7, sources=VALID_SOURCES, score_threshold=score_threshold)
 
-        # Filter by score and valid source
-        filtered = [
-            (doc, score) for doc, score in docs_and_scores
-            if doc.metadata.get("source") in valid_sources and score <= score_threshold
-        ]
+        # Only what fits the token budget goes into the stuff prompt, best chunks first
+        with span("chat.pack_context"):
+            filtered, self.context_report = pack_context(filtered, user_prompt)
 
         docs = [doc for doc, _ in filtered]
         cosine_scores = [score for _, score in filtered]
@@ -75,6 +76,7 @@ User wants to {goal} weight. Answer the following question using the provided co
         print("📄 Filtered Sources (score ≤ threshold):")
         for doc, score in zip(docs, cosine_scores):
             print(f" - {doc.metadata.get('source')}, Score: {score:.4f}")
+        print(f"🧮 Context: {self.context_report['tokens_out']} tokens sent, {self.context_report['tokens_saved']} saved")
 
         doc_summaries = []
         for i, (doc, score) in enumerate(zip(docs, cosine_scores)):
@@ -84,10 +86,61 @@ User wants to {goal} weight. Answer the following question using the provided co
                 f"**Chunk {i+1} — Source: {source}, Similarity Score: {score:.4f}**\n{textwrap.fill(snippet, width=100)}"
             )
 
+        return docs, doc_summaries
+
+    @timed("chat.generate")
+    def generate(self, user_prompt, age, gender, height_cm, present_weight, target_weight, calories, score_threshold=0.5):
+        # The question is embedded once: for the semantic cache lookup and, on a miss, for retrieval
+        embedding = self.embed(user_prompt)
+        bucket = profile_bucket(age, gender, height_cm, present_weight, target_weight, calories)
+        cached = self.semantic_cache.lookup(embedding, bucket)
+        if cached is not None:
+            # The cache is shared by everyone in the bucket: only the answer is reused, the prompt is this user's
+            response, doc_summaries = cached
+            prompt = self.enrich_prompt(user_prompt, age, gender, height_cm, present_weight, target_weight, calories)
+            return prompt.strip(), response, doc_summaries
+
+        docs, doc_summaries = self.retrieve(user_prompt, score_threshold, embedding=embedding)
+
         if not docs:
             return "No relevant chunks found.", "Sorry, no context matched your question well enough.", []
 
         prompt = self.enrich_prompt(user_prompt, age, gender, height_cm, present_weight, target_weight, calories)
-        response = self.chain.run({"input_documents": docs, "question": prompt})
+        cache = get_response_cache()
+        key = cache.make_key(self.model_name, prompt, doc_ids(docs), temperature=self.temperature)
+        response = cache.get_or_call(key, lambda: self.chain.run({"input_documents": docs, "question": prompt}))
 
+        self.semantic_cache.add(embedding, bucket, (response.strip(), doc_summaries))
         return prompt.strip(), response.strip(), doc_summaries
+
+    @timed("chat.generate_stream")
+    def generate_stream(self, user_prompt, age, gender, height_cm, present_weight, target_weight, calories, score_threshold=0.5):
+        # Yields response tokens; self.prompt and self.doc_summaries are set before the first one
+        embedding = self.embed(user_prompt)
+        bucket = profile_bucket(age, gender, height_cm, present_weight, target_weight, calories)
+        cached = self.semantic_cache.lookup(embedding, bucket)
+        if cached is not None:
+            # The cache is shared by everyone in the bucket: only the answer is reused, the prompt is this user's
+            response, self.doc_summaries = cached
+            self.prompt = self.enrich_prompt(user_prompt, age, gender, height_cm, present_weight, target_weight,
+                                             calories).strip()
+            yield response
+            return
+
+        docs, self.doc_summaries = self.retrieve(user_prompt, score_threshold, embedding=embedding)
+
+        if not docs:
+            self.prompt = "No relevant chunks found."
+            yield "Sorry, no context matched your question well enough."
+            return
+
+        prompt = self.enrich_prompt(user_prompt, age, gender, height_cm, present_weight, target_weight, calories)
+        self.prompt = prompt.strip()
+
+        cache = get_response_cache()
+        key = cache.make_key(self.model_name, prompt, doc_ids(docs), temperature=self.temperature)
+        parts = []
+        for token in cache.cached_stream(key, lambda: shared_resources.stream_chain(self.llm, self.chain, docs, prompt)):
+            parts.append(token)
+            yield token
+        self.semantic_cache.add(embedding, bucket, ("".join(parts).strip(), self.doc_summaries))
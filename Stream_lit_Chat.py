@@ -1,10 +1,20 @@
 
+import os
 import streamlit as st
 import pandas as pd
+from dotenv import load_dotenv
+
+# Before the project imports: some of them read settings from the environment at import time
+load_dotenv()
+
+import metrics
 from weight_planner import WeightPlanner
 from meal_planner import MealPlanner
-from gpt_weight_nutrition_planner import GPTWeightNutritionPlanner
-from GPTCustomPrompt import GPTCustomPromptPlanner
+from plan_orchestrator import PlanFanOut
+from semantic_cache import get_semantic_cache
+from scenario_sweep import get_scenario_cache, WEEKLY_RATES
+from recipe_store import RECIPES_CSV, RECIPES_STORE
+from recipe_dataset import load_recipe_dataset
 
 st.set_page_config(page_title="AI Weight & Meal Planner", layout="wide")
 
@@ -40,15 +50,33 @@ with st.sidebar.form("user_inputs"):
     activity = st.selectbox("Activity Level", ["sedentary", "light", "moderate", "very", "super"])
     weekly_loss = st.number_input("Weekly Difference (lbs)", min_value=0.4, max_value=1.0, value=0.5, step=0.1)
     diet=st.selectbox("Diet Preference", ["veg", "non_veg", "vegan"])
+    exclude_ingredients = st.text_input("Exclude ingredients / allergens", placeholder="e.g. nuts, dairy, mushrooms")
+    pantry = st.text_input("Pantry (preferred ingredients)", placeholder="e.g. rice, chickpeas, spinach")
+    forecast_model = st.selectbox("Forecast Model", ["Linear", "Adaptive metabolism"])
     submitted = st.form_submit_button("🥙Submit")
     
 
-@st.cache_data(show_spinner=False)
-def load_recipes_direct(path):
-    return pd.read_csv(path)
+@st.cache_resource(show_spinner=False)
+def load_recipes_direct(store_path, csv_path):
+    # One compact, read-only dataset (and its meal index) shared by every session
+    return load_recipe_dataset(store_path, csv_path)
+
+def exercise_planner():
+    # langchain, FAISS and openai are only imported once a GPT feature is first used
+    from gpt_weight_nutrition_planner import GPTWeightNutritionPlanner
+    return GPTWeightNutritionPlanner()
+
+def custom_prompt_planner():
+    from GPTCustomPrompt import GPTCustomPromptPlanner
+    return GPTCustomPromptPlanner()
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server(port):
+    # One Prometheus endpoint per Streamlit process, shared by all sessions
+    return metrics.start_http_server(port)
 
-csv_path = "Calories\Recipes.csv"
-df = load_recipes_direct(csv_path)
+if os.getenv("METRICS_PORT"):
+    start_metrics_server(int(os.getenv("METRICS_PORT")))
 
 # --- Main Planner Page ---
 if st.session_state.page == "Main Planner":
@@ -68,21 +96,49 @@ if st.session_state.page == "Main Planner":
             weekly_loss_lbs=weekly_loss
         )
         df_weights, target_calories, maintenance_calories = wp.simulate()
-        prompt_summary, summary_text = wp.generate_summary()
+        if forecast_model == "Adaptive metabolism":
+            df_weights, _ = wp.simulate_dynamic()
 
         st.session_state['forecast_df'] = df_weights
         st.session_state['target_calories'] = target_calories
         st.session_state['maintenance_calories'] = maintenance_calories
-        st.session_state['summary_prompt'] = prompt_summary
-        st.session_state['summary_text'] = summary_text
+        # Summary is streamed into the page below instead of blocking here
+        st.session_state['weight_planner'] = wp
+        st.session_state.pop('summary_prompt', None)
+        st.session_state.pop('summary_text', None)
 
-        planner = MealPlanner(df, total_calories=target_calories, diet_type=diet)
+        # Recipes are loaded on the first Submit rather than before the page can render
+        recipes = load_recipes_direct(RECIPES_STORE, RECIPES_CSV)
+        planner = MealPlanner(recipes, total_calories=target_calories, diet_type=diet,
+                              exclude_ingredients=exclude_ingredients, pantry=pantry)
         planner.prepare_data()
         planner.select_meals()
         st.session_state['meal_planner'] = planner
+        # Every rate x activity what-if for this profile, without LLM calls; cached, so resubmits are instant
+        st.session_state['scenarios'] = get_scenario_cache().get_or_sweep(
+            recipes, age=age, gender=gender, height_cm=height_cm, present_weight=present_weight,
+            target_weight=target_weight, diet=diet, exclude_ingredients=exclude_ingredients, pantry=pantry,
+            # The user's own rate is always in the grid, so their plan has a row to compare against
+            weekly_rates=sorted(set(WEEKLY_RATES) | {round(weekly_loss, 2)}))
+        st.session_state['scenario_profile'] = (activity, weekly_loss)
         st.session_state['gpt_annotated'] = False
         st.session_state['gpt_plan'] = None
 
+        # Meal notes and the exercise plan only need target_calories: start them now, in parallel
+        # with the streamed summary, and pick the results up where they are rendered
+        fan_out = PlanFanOut()
+        fan_out.submit("annotations", planner.generate_gpt_annotations)
+        fan_out.submit("exercise", lambda profile: exercise_planner().generate(**profile), {
+            "age": age,
+            "gender": gender,
+            "height_cm": height_cm,
+            "present_weight": present_weight,
+            "target_weight": target_weight,
+            "activity": activity,
+            "calories": target_calories
+        })
+        st.session_state['fan_out'] = fan_out
+
     if "forecast_df" in st.session_state:
         st.subheader("📈Weekly Weight Forecast")
         st.line_chart(st.session_state['forecast_df'].set_index("Week"))
@@ -92,7 +148,36 @@ if st.session_state.page == "Main Planner":
         if 'maintenance_calories' in st.session_state:
             st.markdown(f"**🥙 Maintenance Calories:** `{st.session_state['maintenance_calories']} kcal`")
 
-    if 'summary_prompt' in st.session_state and 'summary_text' in st.session_state:
+    if 'scenarios' in st.session_state:
+        sweep = st.session_state['scenarios']
+        with st.expander("🔀 Compare scenarios (weekly rate × activity level)"):
+            st.dataframe(sweep.table)
+            labels = [f"{row.activity}, {row.weekly_loss:g} lbs/week" for row in sweep.table.itertuples()]
+            # The submitted inputs, not the sidebar's current (possibly unsubmitted) values
+            current = sweep.find(*st.session_state['scenario_profile'])
+            if current is None:
+                st.info("Your submitted rate and activity level are not in this grid; pick a scenario to preview.")
+            else:
+                labels[current] += " (your plan)"
+            choice = st.selectbox("Preview scenario", range(len(sweep)), index=current if current is not None else 0,
+                                  format_func=labels.__getitem__)
+            scenario = sweep.table.iloc[choice]
+            st.markdown(f"**🎯 {scenario['target_calories']} kcal/day**, about **{scenario['weeks']} weeks** to target"
+                        + ("" if scenario['feasible'] else " — ⚠️ not feasible"))
+            st.line_chart(sweep.forecast(choice).set_index("Week"))
+            meals = sweep.meals(choice)
+            if not meals.empty:
+                st.dataframe(meals[['meal_type', 'name', 'calories', 'protein', 'total_fat', 'carbohydrates', 'minutes']])
+
+    if 'summary_text' not in st.session_state and 'weight_planner' in st.session_state:
+        st.subheader("🧑‍⚕️Summary")
+        wp = st.session_state['weight_planner']
+        # Same forecast as the chart, so the text and the curve agree on the timeline
+        st.session_state['summary_text'] = st.write_stream(wp.generate_stream(st.session_state['forecast_df']))
+        st.session_state['summary_prompt'] = wp.prompt
+        with st.expander("Prompt Used"):
+            st.code(st.session_state['summary_prompt'], language='text')
+    elif 'summary_prompt' in st.session_state and 'summary_text' in st.session_state:
         st.subheader("🧑‍⚕️Summary")
         st.markdown(st.session_state['summary_text'])
         with st.expander("Prompt Used"):
@@ -101,21 +186,72 @@ if st.session_state.page == "Main Planner":
     if 'meal_planner' in st.session_state:
         st.subheader("🍽️🧑‍🍳 Daily Meal Plan")
         planner = st.session_state['meal_planner']
-        if not st.session_state.get('gpt_annotated', False):
-            planner.generate_gpt_annotations()
+        if planner.selected_meals_df.empty:
+            st.warning("No recipes matched this diet preference and these ingredient options.")
+        elif not st.session_state.get('gpt_annotated', False):
+            fan_out = st.session_state.get('fan_out')
+            prefetched = False
+            if fan_out is not None and "annotations" in fan_out:
+                try:
+                    # A prefetch already running writes to this planner, so it is waited out, never run twice
+                    with st.spinner("Annotating meals..."):
+                        fan_out.result("annotations", wait_running=True)
+                    prefetched = True
+                except TimeoutError:
+                    # Cancelled before it started: nothing else touches the planner
+                    pass
+            if not prefetched:
+                # No prefetch: show the notes as they stream instead
+                notes = st.empty()
+                with notes.container():
+                    st.write_stream(planner.generate_stream())
+                notes.empty()
             st.session_state['gpt_annotated'] = True
-        selected_df, nutrition = planner.display_plan()
-        st.dataframe(selected_df)
+        if not planner.selected_meals_df.empty:
+            selected_df, nutrition = planner.display_plan()
+            st.dataframe(selected_df)
+
+        if st.button("📅 Weekly Meal Plan"):
+            week_df = planner.select_week()
+            for warning in planner.week_warnings:
+                st.warning(warning)
+            if week_df.empty:
+                st.warning("No recipes matched this diet preference.")
+            else:
+                with st.spinner("Annotating the week..."):
+                    week_df = planner.annotate_week()
+                st.subheader("📅 7-Day Meal Plan")
+                st.dataframe(week_df[['day', 'slot', 'name', 'gpt_name_and_tip', 'calories', 'protein', 'total_fat', 'carbohydrates', 'minutes']])
+                st.markdown("**Daily Totals**")
+                st.dataframe(planner.week_summary())
 
     if st.button("(Exercise & Nutrition Plan)"):
         if 'target_calories' not in st.session_state:
             st.error("Please generate forecast first.")
         else:
             st.subheader("🧑‍⚕️(Exercise & Nutrition Plan)")
+            streamed = False
+            fan_out = st.session_state.get('fan_out')
+            if not st.session_state.get("gpt_plan") and fan_out is not None and "exercise" in fan_out:
+                try:
+                    # A prefetch already running is waited out so the same plan is never paid for twice
+                    with st.spinner("Finishing your plan..."):
+                        gpt_prompt, gpt_response, gpt_docs = fan_out.result("exercise", wait_running=True)
+                    st.session_state['gpt_plan'] = {
+                        "prompt": gpt_prompt,
+                        "response": gpt_response,
+                        "docs": gpt_docs
+                    }
+                except TimeoutError:
+                    # Cancelled before it started: nothing was sent, so generate it now
+                    pass
+                except Exception as e:
+                    st.warning(f"Prefetching the plan failed ({e}); generating it again.")
             if not st.session_state.get("gpt_plan"):
                 try:
-                    gpt_engine = GPTWeightNutritionPlanner()
-                    gpt_prompt, gpt_response, gpt_docs = gpt_engine.generate(
+                    gpt_engine = exercise_planner()
+                    st.subheader("Response")
+                    gpt_response = st.write_stream(gpt_engine.generate_stream(
                         age=age,
                         gender=gender,
                         height_cm=height_cm,
@@ -123,12 +259,13 @@ if st.session_state.page == "Main Planner":
                         target_weight=target_weight,
                         activity=activity,
                         calories=st.session_state['target_calories']
-                    )
+                    ))
                     st.session_state['gpt_plan'] = {
-                        "prompt": gpt_prompt,
-                        "response": gpt_response,
-                        "docs": gpt_docs
+                        "prompt": gpt_engine.prompt,
+                        "response": gpt_response.strip(),
+                        "docs": gpt_engine.doc_summaries
                     }
+                    streamed = True
                 except Exception as e:
                     st.error(f"GPT generation failed: {e}")
 
@@ -137,8 +274,9 @@ if st.session_state.page == "Main Planner":
                 with st.expander("Prompt Sent to GPT"):
                     st.code(plan["prompt"], language='text')
 
-                st.subheader("Response")
-                st.success(plan["response"])
+                if not streamed:
+                    st.subheader("Response")
+                    st.success(plan["response"])
 
                 with st.expander("Retrieved Context Chunks"):
                     for i, doc in enumerate(plan["docs"], 1):
@@ -165,37 +303,70 @@ elif st.session_state.page == "Custom Chat":
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
 
+    def render_context(item):
+        with st.expander("📄Prompt Sent"):
+            st.code(item["prompt"], language='text')
+        with st.expander("📄 Context Source"):
+            for i, doc in enumerate(item["context"], 1):
+                st.markdown(f"**Chunk {i}**")
+                st.markdown(doc, unsafe_allow_html=True)
+
+    for item in st.session_state.chat_history:
+        with st.chat_message("user", avatar=user_avatar_path):
+            st.markdown(item["user"])
+        with st.chat_message("assistant", avatar=bot_avatar_path):
+            st.markdown(item["response"])
+            render_context(item)
+
     user_custom_prompt = st.chat_input("Type your custom question...")
     if user_custom_prompt:
+        with st.chat_message("user", avatar=user_avatar_path):
+            st.markdown(user_custom_prompt)
         try:
-            gpt_custom = GPTCustomPromptPlanner()
-            prompt_out, response_out, docs_out = gpt_custom.generate(
-                user_prompt=user_custom_prompt,
-                age=age,
-                gender=gender,
-                height_cm=height_cm,
-                present_weight=present_weight,
-                target_weight=target_weight,
-                calories=calories
-            )
-            st.session_state.chat_history.append({
-                "user": user_custom_prompt,
-                "response": response_out,
-                "context": docs_out,
-                "prompt": prompt_out 
-            })
+            gpt_custom = custom_prompt_planner()
+            with st.chat_message("assistant", avatar=bot_avatar_path):
+                response_out = st.write_stream(gpt_custom.generate_stream(
+                    user_prompt=user_custom_prompt,
+                    age=age,
+                    gender=gender,
+                    height_cm=height_cm,
+                    present_weight=present_weight,
+                    target_weight=target_weight,
+                    calories=calories
+                ))
+                item = {
+                    "user": user_custom_prompt,
+                    "response": response_out.strip(),
+                    "context": gpt_custom.doc_summaries,
+                    "prompt": gpt_custom.prompt
+                }
+                render_context(item)
+            st.session_state.chat_history.append(item)
 
         except Exception as e:
             st.error(f"Custom GPT prompt failed: {e}")
 
-    for item in st.session_state.chat_history:
-        with st.chat_message("user", avatar=user_avatar_path):
-            st.markdown(item["user"])
-        with st.chat_message("assistant", avatar=bot_avatar_path):
-            st.markdown(item["response"])
-            with st.expander("📄Prompt Sent"):
-                st.code(item["prompt"], language='text')
-            with st.expander("📄 Context Source"):
-                for i, doc in enumerate(item["context"], 1):
-                    st.markdown(f"**Chunk {i}**")
-                    st.markdown(doc, unsafe_allow_html=True)
+    cache_stats = get_semantic_cache().stats()
+    st.sidebar.caption(f"Answer cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_ratio']:.0%})")
+
+# --- Debug Panel ---
+if st.sidebar.checkbox("🛠️Debug metrics", value=False):
+    snapshot = metrics.get_metrics().snapshot()
+    with st.sidebar.expander("Stage timings", expanded=True):
+        if snapshot["stages"]:
+            stages = pd.DataFrame(snapshot["stages"]).T[["count", "mean_s", "max_s", "total_s"]]
+            st.dataframe(stages.sort_values("total_s", ascending=False).round(3))
+        st.caption("Last spans:")
+        for entry in snapshot["recent"][-12:]:
+            st.text(f"{'  ' * entry['depth']}{entry['stage']}: {entry['seconds'] * 1000:.0f} ms")
+    with st.sidebar.expander("LLM usage"):
+        for model, usage in snapshot["llm"].items():
+            st.text(f"{model}: {usage['calls']} calls, {usage['prompt_tokens']}+{usage['completion_tokens']} tokens, "
+                    f"${usage['cost_usd']:.4f}")
+    with st.sidebar.expander("Caches"):
+        for name, stats in snapshot["caches"].items():
+            st.text(f"{name}: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_ratio']:.0%})")
+    if snapshot["counters"]:
+        with st.sidebar.expander("Counters"):
+            for name, value in snapshot["counters"].items():
+                st.text(f"{name}: {value:.0f}")
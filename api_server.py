@@ -0,0 +1,256 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
+from typing import Annotated, List, Literal
+import uvicorn
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import shared_resources
+from metrics import get_metrics
+from weight_planner import simulate_batch
+from meal_planner import MealPlanner
+from recipe_store import RECIPES_CSV, RECIPES_STORE
+from recipe_dataset import load_recipe_dataset
+from scenario_sweep import get_scenario_cache, WEEKLY_RATES, ACTIVITY_LEVELS
+
+VECTOR_PATH = os.getenv("VECTOR_PATH", "vector")
+# Forecast requests arriving within this window are simulated together in one vectorized call
+BATCH_WINDOW_SECONDS = float(os.getenv("FORECAST_BATCH_WINDOW", 0.005))
+MAX_BATCH_SIZE = int(os.getenv("FORECAST_MAX_BATCH", 512))
+
+
+class Profile(BaseModel):
+    age: int = Field(..., ge=18, le=100)
+    gender: Literal["male", "female"]
+    height_cm: float = Field(..., ge=120, le=220)
+    present_weight: float = Field(..., ge=40, le=200)
+    target_weight: float = Field(..., ge=40, le=200)
+    activity: Literal["sedentary", "light", "moderate", "very", "super"] = "moderate"
+    weekly_loss: float = Field(0.5, ge=0.1, le=2.0)
+
+
+class MealPlanRequest(BaseModel):
+    profile: Profile
+    diet: Literal["veg", "non_veg", "vegan"] = "veg"
+    exclude_ingredients: List[str] = []
+    include_ingredients: List[str] = []
+    pantry: List[str] = []
+    annotate: bool = False
+
+
+class ScenarioRequest(BaseModel):
+    profile: Profile
+    diet: Literal["veg", "non_veg", "vegan"] = "veg"
+    weekly_rates: List[Annotated[float, Field(ge=0.1, le=2.0)]] = Field(list(WEEKLY_RATES), min_length=1, max_length=20)
+    activity_levels: List[Literal["sedentary", "light", "moderate", "very", "super"]] = list(ACTIVITY_LEVELS)
+    exclude_ingredients: List[str] = []
+    include_ingredients: List[str] = []
+    pantry: List[str] = []
+
+
+class ChatRequest(BaseModel):
+    profile: Profile
+    question: str
+
+
+class ForecastBatcher:
+    """Coalesces concurrent /forecast calls into a single simulate_batch over all pending profiles."""
+
+    def __init__(self, window=BATCH_WINDOW_SECONDS, max_batch=MAX_BATCH_SIZE):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            # Wait for the loop to unwind so shutdown doesn't leave a pending task behind
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def submit(self, profile):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((profile, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = forecast([profile for profile, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+def forecast(profiles):
+    weights, weeks, target_cal, maintenance_cal = simulate_batch(
+        [p.present_weight for p in profiles], [p.target_weight for p in profiles], [p.age for p in profiles],
+        [p.height_cm for p in profiles], [p.gender for p in profiles], [p.activity for p in profiles],
+        [p.weekly_loss for p in profiles])
+    return [
+        {
+            "weeks": int(weeks[i]),
+            "target_calories": int(target_cal[i]),
+            "maintenance_calories": int(maintenance_cal[i]),
+            "forecast": [float(w) for w in weights[i, :weeks[i] + 1]],
+        }
+        for i in range(len(profiles))
+    ]
+
+
+state = {}
+
+
+def llm_configured():
+    # Forecasts, meal plans and scenarios need no LLM, so the service also starts without a key
+    return bool(os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_BASE_URL"))
+
+
+def require_llm():
+    if not llm_configured():
+        raise HTTPException(status_code=503, detail="LLM endpoints need OPENAI_API_KEY (or OPENAI_BASE_URL) to be set")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm everything a request could need before accepting traffic
+    state["recipes"] = load_recipe_dataset(RECIPES_STORE, RECIPES_CSV)
+    state["meal_index"] = state["recipes"].index
+    if os.path.exists(VECTOR_PATH):
+        await run_in_threadpool(shared_resources.get_vectorstore, VECTOR_PATH)
+    if llm_configured():
+        shared_resources.get_openai_client()
+    state["batcher"] = ForecastBatcher()
+    state["batcher"].start()
+    yield
+    await state["batcher"].stop()
+
+
+app = FastAPI(title="AI Weight & Meal Planner API", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "recipes": len(state.get("recipes", ()))}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition: stage timings, LLM tokens/cost, cache hit ratios
+    return get_metrics().prometheus_text()
+
+
+@app.post("/forecast")
+async def forecast_one(profile: Profile):
+    return await state["batcher"].submit(profile)
+
+
+@app.post("/forecast/batch")
+async def forecast_many(profiles: Annotated[List[Profile], Body(max_length=MAX_BATCH_SIZE)]):
+    return forecast(profiles)
+
+
+def _meal_records(meals, columns):
+    meals = meals[[col for col in columns if col in meals.columns]]
+    # float32 recipe nutrition would serialize as 360.1000061035156
+    floats = meals.select_dtypes("float32").columns
+    meals = meals.astype({col: "float64" for col in floats}).round({col: 1 for col in floats})
+    return meals.astype(object).to_dict("records")
+
+
+def _meal_plan(request):
+    target = forecast([request.profile])[0]["target_calories"]
+    planner = MealPlanner(state["recipes"], total_calories=target, diet_type=request.diet, index=state["meal_index"],
+                          exclude_ingredients=request.exclude_ingredients,
+                          include_ingredients=request.include_ingredients, pantry=request.pantry)
+    planner.prepare_data()
+    planner.select_meals()
+    if planner.selected_meals_df.empty:
+        raise HTTPException(status_code=404, detail=f"No recipes for diet '{request.diet}' and these ingredient options")
+    if request.annotate:
+        planner.generate_gpt_annotations()
+    meals = _meal_records(planner.selected_meals_df, ["meal_type", "id", "name", "minutes", "calories", "protein",
+                                                      "total_fat", "carbohydrates", "ingredients", "steps", "gpt_name",
+                                                      "gpt_tip", "calorie_warning", "gpt_name_and_tip"])
+    for meal in meals:
+        meal["ingredients"] = list(meal["ingredients"])
+        meal["steps"] = list(meal["steps"])
+    return {"target_calories": target, "meals": meals}
+
+
+# Blocking (LLM / pandas) endpoints are plain defs so FastAPI runs them on its worker threadpool
+@app.post("/meal-plan")
+def meal_plan(request: MealPlanRequest):
+    return _meal_plan(request)
+
+
+@app.post("/scenarios")
+def scenarios(request: ScenarioRequest):
+    """Forecast and meal plan for every weekly rate x activity level; no LLM calls, cached per profile."""
+    profile = request.profile
+    sweep = get_scenario_cache().get_or_sweep(
+        state["recipes"], age=profile.age, gender=profile.gender, height_cm=profile.height_cm,
+        present_weight=profile.present_weight, target_weight=profile.target_weight, diet=request.diet,
+        weekly_rates=request.weekly_rates, activity_levels=request.activity_levels,
+        exclude_ingredients=request.exclude_ingredients, include_ingredients=request.include_ingredients,
+        pantry=request.pantry)
+    rows = sweep.table.astype(object).where(sweep.table.notna(), None).to_dict("records")
+    for i, row in enumerate(rows):
+        row["meals"] = _meal_records(sweep.meals(i), ["meal_type", "id", "name", "calories"])
+    return {"scenarios": rows}
+
+
+@app.post("/exercise-plan")
+def exercise_plan(profile: Profile):
+    from gpt_weight_nutrition_planner import GPTWeightNutritionPlanner
+
+    require_llm()
+    target = forecast([profile])[0]["target_calories"]
+    prompt, response, docs = GPTWeightNutritionPlanner(vector_path=VECTOR_PATH).generate(
+        age=profile.age, gender=profile.gender, height_cm=profile.height_cm, present_weight=profile.present_weight,
+        target_weight=profile.target_weight, activity=profile.activity, calories=target)
+    return {"prompt": prompt, "response": response, "context": docs}
+
+
+@app.post("/chat")
+def chat(request: ChatRequest):
+    from GPTCustomPrompt import GPTCustomPromptPlanner
+
+    require_llm()
+    profile = request.profile
+    target = forecast([profile])[0]["target_calories"]
+    prompt, response, docs = GPTCustomPromptPlanner(vector_path=VECTOR_PATH).generate(
+        user_prompt=request.question, age=profile.age, gender=profile.gender, height_cm=profile.height_cm,
+        present_weight=profile.present_weight, target_weight=profile.target_weight, calories=target)
+    return {"prompt": prompt, "response": response, "context": docs}
+
+
+if __name__ == "__main__":
+    # Point OPENAI_BASE_URL / OPENAI_API_BASE at a stub server to load-test without real API calls
+    uvicorn.run("api_server:app", host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", 8000)),
+                workers=int(os.getenv("API_WORKERS", 1)))
@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from weight_planner import WeightPlanner, simulate_batch
+from meal_planner import MealPlanner
+from recipe_store import RECIPES_CSV, RECIPES_STORE
+from recipe_dataset import load_recipe_dataset
+
+PROFILE_DEFAULTS = {"activity": "moderate", "weekly_loss": 1.0, "diet": "veg"}
+NUMERIC_FIELDS = ("age", "height_cm", "present_weight", "target_weight")
+
+
+def read_profiles(path):
+    if path.endswith(".jsonl"):
+        profiles = pd.read_json(path, lines=True)
+    else:
+        profiles = pd.read_csv(path)
+    for column, default in PROFILE_DEFAULTS.items():
+        if column not in profiles.columns:
+            profiles[column] = default
+        else:
+            profiles[column] = profiles[column].fillna(default)
+    if "user_id" not in profiles.columns:
+        profiles["user_id"] = profiles.index.astype(str)
+    profiles["user_id"] = profiles["user_id"].astype(str)
+    return profiles.to_dict("records")
+
+
+def completed_ids(out_path):
+    # Anything written without an error is done; a resumed run plans the rest and retries errored rows
+    # (so an errored user_id can appear again later in the output, and the last row for it wins)
+    done = set()
+    if out_path.endswith(".jsonl"):
+        if os.path.exists(out_path):
+            with open(out_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted write
+                    if "user_id" in result and result.get("error") is None:
+                        done.add(result["user_id"])
+    else:
+        for part in glob.glob(os.path.join(out_path, "part-*.parquet")):
+            table = pq.read_table(part, columns=["user_id", "error"])
+            for user_id, error in zip(table.column("user_id").to_pylist(), table.column("error").to_pylist()):
+                if error is None:
+                    done.add(user_id)
+    return done
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (per worker process)."""
+
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec else 0.0
+        self.next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Per-worker state, loaded once by _init_worker
+_recipes = None
+_index = None
+_planners = {}
+_limiter = None
+
+
+def _init_worker(store_path, csv_path, llm_rate_per_worker):
+    global _recipes, _index, _limiter
+    _recipes = load_recipe_dataset(store_path, csv_path)
+    _index = _recipes.index
+    _limiter = RateLimiter(llm_rate_per_worker)
+
+
+def _planner_for(diet):
+    if diet not in _planners:
+        planner = MealPlanner(_recipes, diet_type=diet, index=_index)
+        planner.prepare_data()
+        _planners[diet] = planner
+    return _planners[diet]
+
+
+def profile_error(profile):
+    """Why a profile can't be simulated (blank or non-numeric fields, unknown gender), or None."""
+    invalid = []
+    for field in NUMERIC_FIELDS:
+        try:
+            if not math.isfinite(float(profile.get(field))):
+                invalid.append(field)
+        except (TypeError, ValueError):
+            invalid.append(field)
+    if str(profile.get("gender")).lower() not in ("male", "female"):
+        invalid.append("gender")
+    return f"ValueError: missing or invalid {', '.join(invalid)}" if invalid else None
+
+
+def error_result(profile, error):
+    return {"user_id": profile["user_id"], "weeks": None, "target_calories": None, "maintenance_calories": None,
+            "forecast": None, "error": error}
+
+
+def plan_chunk(profiles, with_llm=False):
+    # Invalid rows get an error record; one blank cell must not fail the whole chunk
+    errors = [profile_error(p) for p in profiles]
+    valid = [p for p, error in zip(profiles, errors) if error is None]
+    weights, weeks, target_cal, maintenance_cal = simulate_batch(
+        [p["present_weight"] for p in valid], [p["target_weight"] for p in valid],
+        [p["age"] for p in valid], [p["height_cm"] for p in valid], [p["gender"] for p in valid],
+        [p["activity"] for p in valid], [p["weekly_loss"] for p in valid])
+
+    results = []
+    i = -1
+    for profile, error in zip(profiles, errors):
+        if error is not None:
+            results.append(error_result(profile, error))
+            continue
+        i += 1
+        result = {
+            "user_id": profile["user_id"],
+            "weeks": int(weeks[i]),
+            "target_calories": int(target_cal[i]),
+            "maintenance_calories": int(maintenance_cal[i]),
+            "forecast": [float(w) for w in weights[i, :weeks[i] + 1]],
+            "error": None,
+        }
+        try:
+            planner = _planner_for(profile["diet"])
+            planner.total_calories = result["target_calories"]
+            planner.select_meals()
+            meals = planner.selected_meals_df
+            result["meals"] = [
+                {"meal_type": str(row["meal_type"]), "id": int(row["id"]), "name": str(row["name"]), "calories": round(float(row["calories"]), 1)}
+                for _, row in meals.iterrows()
+            ]
+            if with_llm:
+                result.update(_llm_steps(profile, planner, result["target_calories"]))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+
+def _llm_steps(profile, planner, target_calories):
+    from gpt_weight_nutrition_planner import GPTWeightNutritionPlanner
+
+    wp = WeightPlanner(profile["present_weight"], profile["target_weight"], profile["age"], profile["height_cm"],
+                       profile["gender"], profile["activity"], profile["weekly_loss"])
+    _limiter.wait()
+    _, summary = wp.generate_summary()
+    _limiter.wait()
+    planner.generate_gpt_annotations()
+    _limiter.wait()
+    _, exercise_plan, _ = GPTWeightNutritionPlanner().generate(
+        age=profile["age"], gender=profile["gender"], height_cm=profile["height_cm"],
+        present_weight=profile["present_weight"], target_weight=profile["target_weight"],
+        activity=profile["activity"], calories=target_calories)
+    return {
+        "summary": summary,
+        "annotations": planner.selected_meals_df[["id", "gpt_name", "gpt_tip", "calorie_warning"]].to_dict("records"),
+        "exercise_plan": exercise_plan,
+    }
+
+
+MEAL_TYPE = pa.struct([("meal_type", pa.string()), ("id", pa.int64()), ("name", pa.string()),
+                       ("calories", pa.float64())])
+ANNOTATION_TYPE = pa.struct([("id", pa.int64()), ("gpt_name", pa.string()), ("gpt_tip", pa.string()),
+                             ("calorie_warning", pa.string())])
+# Fixed so every part has the same schema, whichever rows a chunk happens to start with
+# (errored rows have no meals; the LLM columns are null unless --with-llm)
+RESULT_SCHEMA = pa.schema([
+    ("user_id", pa.string()),
+    ("weeks", pa.int64()),
+    ("target_calories", pa.int64()),
+    ("maintenance_calories", pa.int64()),
+    ("forecast", pa.list_(pa.float64())),
+    ("meals", pa.list_(MEAL_TYPE)),
+    ("error", pa.string()),
+    ("summary", pa.string()),
+    ("annotations", pa.list_(ANNOTATION_TYPE)),
+    ("exercise_plan", pa.string()),
+])
+
+
+class ResultWriter:
+    def __init__(self, out_path):
+        self.out_path = out_path
+        if out_path.endswith(".jsonl"):
+            self.parts = None
+        else:
+            os.makedirs(out_path, exist_ok=True)
+            self.parts = len(glob.glob(os.path.join(out_path, "part-*.parquet")))
+
+    def write(self, results):
+        if self.parts is None:
+            with open(self.out_path, "a", encoding="utf-8") as f:
+                for result in results:
+                    f.write(json.dumps(result) + "\n")
+        else:
+            # One immutable part per chunk: a crash never leaves a half-written file behind
+            part = os.path.join(self.out_path, f"part-{self.parts:05d}.parquet")
+            pq.write_table(pa.Table.from_pylist(results, schema=RESULT_SCHEMA), part + ".tmp")
+            os.replace(part + ".tmp", part)
+            self.parts += 1
+
+
+def run_batch(profiles_path, out_path, workers=None, chunk_size=256, with_llm=False, llm_rate=2.0,
+              store_path=RECIPES_STORE, csv_path=RECIPES_CSV):
+    profiles = read_profiles(profiles_path)
+    done = completed_ids(out_path)
+    pending = [p for p in profiles if p["user_id"] not in done]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    print(f"{len(profiles)} profiles, {len(done)} already done, {len(pending)} to plan in {len(chunks)} chunks")
+
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(out_path)
+    started = time.perf_counter()
+    planned = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(store_path, csv_path, llm_rate / workers)) as executor:
+        # Keep a bounded number of chunks in flight so memory does not grow with the input
+        queue = iter(chunks)
+        in_flight = {}
+        for chunk in queue:
+            in_flight[executor.submit(plan_chunk, chunk, with_llm)] = chunk
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk = in_flight.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # A failed chunk is recorded as errors (retried on resume); the other chunks keep going
+                    results = [error_result(profile, f"{type(e).__name__}: {e}") for profile in chunk]
+                writer.write(results)
+                planned += len(results)
+                next_chunk = next(queue, None)
+                if next_chunk is not None:
+                    in_flight[executor.submit(plan_chunk, next_chunk, with_llm)] = next_chunk
+            elapsed = time.perf_counter() - started
+            print(f"{planned}/{len(pending)} planned ({planned / elapsed:.1f} profiles/sec)")
+    return planned
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate weight and meal plans headlessly for a list of users.")
+    parser.add_argument("profiles", help="CSV or JSONL with age, gender, height_cm, present_weight, target_weight "
+                                         "[, activity, weekly_loss, diet, user_id]")
+    parser.add_argument("out", help="results.jsonl, or a directory for Parquet part files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--llm", action="store_true", help="Also run the summary, meal annotation and exercise plan calls")
+    parser.add_argument("--llm-rate", type=float, default=2.0, help="Max LLM requests per second across all workers")
+    args = parser.parse_args()
+    run_batch(args.profiles, args.out, args.workers, args.chunk_size, args.llm, args.llm_rate)
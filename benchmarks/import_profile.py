@@ -0,0 +1,61 @@
+"""Import-time profile of the app modules, from `python -X importtime` in a fresh interpreter per module.
+
+    python -m benchmarks.import_profile                       # all entry modules
+    python -m benchmarks.import_profile meal_planner --top 15 --output import_profile.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = ["weight_planner", "meal_planner", "recipe_store", "gpt_weight_nutrition_planner", "GPTCustomPrompt",
+           "shared_resources", "retrieval", "batch_plans", "api_server"]
+# Loaded on first use; any of these showing up at import time is a regression
+HEAVY = ("langchain", "langchain_community", "langchain_core", "openai", "faiss", "streamlit", "httpx")
+
+
+def profile(module):
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative |  (indented) module"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    top_level = next((entry for entry in imports if entry["module"] == module), None)
+    loaded = {entry["module"].split(".")[0] for entry in imports}
+    return {
+        "module": module,
+        "ok": completed.returncode == 0,
+        "error": completed.stderr.strip().splitlines()[-1] if completed.returncode else None,
+        "total_ms": top_level["cumulative_ms"] if top_level else None,
+        "heavy_imported": sorted(loaded.intersection(HEAVY)),
+        "imports": imports,
+    }
+
+
+def report(results, top=10):
+    for result in results:
+        if not result["ok"]:
+            print(f"{result['module']:32s} failed: {result['error']}")
+            continue
+        heavy = ", ".join(result["heavy_imported"]) or "none"
+        print(f"{result['module']:32s} {result['total_ms']:9.1f} ms   heavy deps at import: {heavy}")
+        slowest = sorted(result["imports"], key=lambda entry: entry["self_ms"], reverse=True)[:top]
+        for entry in slowest:
+            print(f"    {entry['self_ms']:8.1f} ms  {entry['module']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import time per app module.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--top", type=int, default=5, help="Slowest individual imports listed per module")
+    parser.add_argument("--output", default=None, help="Write the full profile JSON here")
+    args = parser.parse_args()
+    results = [profile(module) for module in args.modules]
+    report(results, args.top)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,138 @@
+"""OpenAI-compatible stub server with configurable latency, for offline end-to-end and load tests.
+
+    python -m benchmarks.llm_stub --port 8100 --latency 0.4 --token-delay 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub streamlit run Stream_lit_Chat.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+settings = {
+    "latency": float(os.getenv("STUB_LATENCY", 0.3)),  # seconds before the first token / full response
+    "token_delay": float(os.getenv("STUB_TOKEN_DELAY", 0.01)),  # seconds between streamed tokens
+    "tokens": int(os.getenv("STUB_TOKENS", 120)),  # completion length
+    "embedding_dim": int(os.getenv("STUB_EMBEDDING_DIM", 1536)),
+    "embedding_latency": float(os.getenv("STUB_EMBEDDING_LATENCY", 0.05)),
+}
+stats = {"chat": 0, "embeddings": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+app = FastAPI(title="LLM stub")
+
+
+def _count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _completion_words(messages, json_mode=False):
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    if json_mode:
+        # Meal annotation requests list one "id=<recipe id> | ..." line per recipe
+        ids = [int(line.split("|")[0][3:]) for line in prompt.splitlines() if line.startswith("id=")]
+        meals = [{"id": i, "name": f"Stub Meal {i}", "tip": "stub tip.", "calorie_warning": None} for i in ids]
+        return json.dumps({"meals": meals}).split(" ")
+    words = [f"word{i % 50}" for i in range(settings["tokens"])]
+    return (["Stub", "response:"] + words)[:settings["tokens"]]
+
+
+def embed(text):
+    # Deterministic unit vector per text, so identical inputs hit caches like real embeddings do
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(settings["embedding_dim"]).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "stub"}]}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "gpt-4o-mini")
+    words = _completion_words(messages, (body.get("response_format") or {}).get("type") == "json_object")
+    prompt_tokens = _count_tokens(" ".join(str(m.get("content", "")) for m in messages))
+    stats["chat"] += 1
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += len(words)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(settings["latency"] + settings["token_delay"] * len(words))
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                      "total_tokens": prompt_tokens + len(words)},
+        }
+
+    async def events():
+        def event(choices, **extra):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": choices, **extra}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        def chunk(delta, finish_reason=None):
+            return event([{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+        await asyncio.sleep(settings["latency"])
+        yield chunk({"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            yield chunk({"content": word if i == 0 else " " + word})
+            await asyncio.sleep(settings["token_delay"])
+        yield chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield event([], usage={"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                                   "total_tokens": prompt_tokens + len(words)})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    # langchain may send pre-tokenized input (lists of token ids)
+    texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+    stats["embeddings"] += len(texts)
+    await asyncio.sleep(settings["embedding_latency"])
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-ada-002"),
+        "data": [{"object": "embedding", "index": i, "embedding": embed(text)} for i, text in enumerate(texts)],
+        "usage": {"prompt_tokens": sum(map(_count_tokens, texts)), "total_tokens": sum(map(_count_tokens, texts))},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve an OpenAI-compatible stub API with configurable latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=settings["latency"])
+    parser.add_argument("--token-delay", type=float, default=settings["token_delay"])
+    parser.add_argument("--tokens", type=int, default=settings["tokens"])
+    parser.add_argument("--embedding-dim", type=int, default=settings["embedding_dim"])
+    parser.add_argument("--embedding-latency", type=float, default=settings["embedding_latency"])
+    args = parser.parse_args()
+    settings.update(latency=args.latency, token_delay=args.token_delay, tokens=args.tokens,
+                    embedding_dim=args.embedding_dim, embedding_latency=args.embedding_latency)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,94 @@
+"""Concurrent load generator for api_server, reporting throughput and latency percentiles as JSON.
+
+    python -m benchmarks.llm_stub &                       # offline LLM
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub python api_server.py &
+    python -m benchmarks.load_test --endpoint forecast --concurrency 64 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import httpx
+import numpy as np
+
+
+def random_profile(rng):
+    present = rng.uniform(60, 130)
+    return {
+        "age": rng.randint(18, 70),
+        "gender": rng.choice(["male", "female"]),
+        "height_cm": round(rng.uniform(150, 200), 1),
+        "present_weight": round(present, 1),
+        "target_weight": round(present - rng.uniform(2, 20), 1),
+        "activity": rng.choice(["sedentary", "light", "moderate", "very", "super"]),
+        "weekly_loss": rng.choice([0.25, 0.5, 1.0]),
+    }
+
+
+PAYLOADS = {
+    "forecast": ("/forecast", lambda rng: random_profile(rng)),
+    "meal-plan": ("/meal-plan", lambda rng: {"profile": random_profile(rng), "diet": rng.choice(["veg", "non_veg", "vegan"])}),
+    "exercise-plan": ("/exercise-plan", lambda rng: random_profile(rng)),
+    "chat": ("/chat", lambda rng: {"profile": random_profile(rng),
+                                   "question": rng.choice(["How much protein do I need?", "Is fasting useful?"])}),
+}
+
+
+async def run(base_url, endpoint, concurrency, total, seed=0, timeout=120.0):
+    path, make_payload = PAYLOADS[endpoint]
+    rng = random.Random(seed)
+    payloads = [make_payload(rng) for _ in range(total)]
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            payload = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latency = np.asarray(latencies) * 1e3
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": float(np.percentile(latency, 50)) if len(latency) else None,
+            "p95": float(np.percentile(latency, 95)) if len(latency) else None,
+            "p99": float(np.percentile(latency, 99)) if len(latency) else None,
+            "max": float(latency.max()) if len(latency) else None,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the planner API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=sorted(PAYLOADS), default="forecast")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--output", default=None, help="Write the result JSON here as well")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.url, args.endpoint, args.concurrency, args.requests))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
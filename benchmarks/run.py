@@ -0,0 +1,199 @@
+"""Micro-benchmarks for the planning hot paths on synthetic data of several sizes.
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output bench_results.json
+    python -m benchmarks.run --compare bench_results.json   # ratios against a previous run
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack", "other", "smoothie"]
+DIET_TYPES = ["veg", "non_veg", "vegan"]
+INGREDIENTS = ["eggs", "milk", "chicken breast", "rice", "salt", "olive oil", "garlic", "onion", "tomato", "beef",
+               "oats", "honey", "butter", "spinach", "peanuts", "black beans", "tofu", "flour", "sugar", "lemon juice"]
+
+
+def synthetic_recipes(n, seed=0):
+    """Recipes.csv-shaped frame with list cells stored as strings, like the real export."""
+    rng = np.random.default_rng(seed)
+    nutrition = np.column_stack([rng.uniform(50, 1200, n)] + [rng.integers(0, 60, n) for _ in range(6)]).round(1)
+    counts = rng.integers(2, 9, n)
+    ingredients = [str(list(rng.choice(INGREDIENTS, k, replace=False).tolist())) for k in counts]
+    return pd.DataFrame({
+        "name": [f"recipe {i}" for i in range(n)],
+        "id": np.arange(n) + 100000,
+        "minutes": rng.integers(5, 120, n),
+        "tags": "['time-to-make', 'course']",
+        "steps": [str([f"step {j} of recipe {i}" for j in range(3)]) for i in range(n)],
+        "description": "synthetic",
+        "ingredients": ingredients,
+        "n_ingredients": counts,
+        "meal_type": rng.choice(MEAL_TYPES, n),
+        "diet_type": rng.choice(DIET_TYPES, n),
+        "calories": nutrition[:, 0], "total_fat": nutrition[:, 1], "sugar": nutrition[:, 2], "sodium": nutrition[:, 3],
+        "protein": nutrition[:, 4], "saturated_fat": nutrition[:, 5], "carbohydrates": nutrition[:, 6],
+    })
+
+
+def measure(fn, repeat=5, setup=None):
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        fn(arg) if setup else fn()
+        timings.append(time.perf_counter() - started)
+    return {"min": min(timings), "median": statistics.median(timings), "mean": statistics.fmean(timings), "repeat": repeat}
+
+
+def bench_recipes(n, workdir, repeat):
+    from recipe_store import build_recipe_store, load_recipes
+    from meal_planner import MealPlanner
+    from meal_index import MealIndex
+    from recipe_dataset import RecipeDataset
+    from ingredient_index import IngredientIndex
+
+    csv_path = os.path.join(workdir, f"recipes_{n}.csv")
+    store_path = os.path.join(workdir, f"recipes_{n}.parquet")
+    synthetic_recipes(n).to_csv(csv_path)
+    build_recipe_store(csv_path, store_path)
+
+    raw = pd.read_csv(csv_path)
+    store = load_recipes(store_path, csv_path)
+    dataset = RecipeDataset(store)
+    index = dataset.index
+
+    def select(planner):
+        planner.select_meals()
+
+    def new_planner():
+        planner = MealPlanner(dataset, total_calories=2000, diet_type="veg", index=index)
+        planner.prepare_data()
+        return planner
+
+    return {
+        "load_csv": measure(lambda: pd.read_csv(csv_path), repeat),
+        "load_store": measure(lambda: load_recipes(store_path, csv_path), repeat),
+        "dataset_from_csv": measure(lambda: RecipeDataset(raw), repeat),
+        "dataset_from_store": measure(lambda: RecipeDataset(store), repeat),
+        "new_planner": measure(new_planner, repeat),
+        "meal_index_build": measure(lambda: MealIndex(store), repeat),
+        "select_meals": measure(select, repeat, setup=new_planner),
+        "select_week": measure(lambda planner: planner.select_week(), repeat, setup=new_planner),
+        "ingredient_index_build": measure(lambda: IngredientIndex.from_dataset(dataset), repeat),
+        "ingredient_exclude_query": measure(lambda ingredients: ingredients.query(exclude="dairy, nuts"), repeat,
+                                            setup=lambda: IngredientIndex.from_dataset(dataset)),
+        "ingredient_exclude_apply": measure(
+            lambda: ~store['ingredients'].apply(lambda items: any('milk' in item or 'nut' in item for item in items)),
+            repeat),
+    }
+
+
+def bench_simulation(n, repeat):
+    from weight_planner import WeightPlanner, simulate_batch, simulate_dynamic_batch
+
+    rng = np.random.default_rng(0)
+    present, target = rng.uniform(60, 120, n), rng.uniform(55, 90, n)
+    gender = rng.choice(["male", "female"], n)
+    rate = rng.uniform(0.4, 1.0, n)
+    return {
+        "simulate_single": measure(lambda: WeightPlanner(85, 75, 30, 176, "male", "moderate", 0.5).simulate(), repeat),
+        "simulate_batch": measure(lambda: simulate_batch(present, target, 30, 170, gender, "light", rate), repeat),
+        "simulate_dynamic_batch": measure(
+            lambda: simulate_dynamic_batch(present, target, 30, 170, gender, "light", rate, step_days=7), repeat),
+    }
+
+
+def bench_retrieval(n, repeat, dim=256):
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import FakeEmbeddings
+    from retrieval import filtered_search, VALID_SOURCES
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    sources = rng.choice(sorted(VALID_SOURCES) + ["other"] * 8, n)
+    store = FAISS.from_embeddings(
+        [(f"chunk {i}", vectors[i].tolist()) for i in range(n)], FakeEmbeddings(size=dim),
+        metadatas=[{"source": str(s)} for s in sources])
+    query = rng.standard_normal(dim).astype(np.float32).tolist()
+
+    def post_filter():
+        docs = store.similarity_search_with_score_by_vector(query, k=7)
+        return [(d, s) for d, s in docs if d.metadata.get("source") in VALID_SOURCES]
+
+    filtered_search(store, query)  # first call builds the per-store bitmap
+    return {
+        "faiss_search_post_filter": measure(post_filter, repeat),
+        "faiss_search_filtered": measure(lambda: filtered_search(store, query), repeat),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, include_retrieval=True):
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "benchmarks": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            print(f"-- size {n}")
+            groups = {"recipes": bench_recipes(n, workdir, repeat), "simulation": bench_simulation(n, repeat)}
+            if include_retrieval:
+                groups["retrieval"] = bench_retrieval(n, repeat)
+            for group, benches in groups.items():
+                for name, timing in benches.items():
+                    key = f"{group}.{name}[{n}]"
+                    results["benchmarks"][key] = timing
+                    print(f"{key:55s} median {timing['median'] * 1e3:10.3f} ms")
+    return results
+
+
+def compare(current, previous):
+    print(f"\n{'benchmark':55s} {'previous':>12s} {'current':>12s} {'ratio':>8s}")
+    for key, timing in current["benchmarks"].items():
+        before = previous["benchmarks"].get(key)
+        if before:
+            ratio = timing["median"] / before["median"]
+            flag = "  slower" if ratio > 1.1 else ("  faster" if ratio < 0.9 else "")
+            print(f"{key:55s} {before['median'] * 1e3:10.3f}ms {timing['median'] * 1e3:10.3f}ms {ratio:7.2f}x{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recipe load/parse, meal selection, simulation and retrieval.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--no-retrieval", action="store_true")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    current = run(args.sizes, args.repeat, include_retrieval=not args.no_retrieval)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+    if previous:
+        compare(current, previous)
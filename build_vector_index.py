@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from shared_resources import MANIFEST_FILE, make_embeddings
+
+SOURCE_DIR = os.path.join("Calories", "All_5_files")
+VECTOR_PATH = "vector"
+LOCAL_EMBEDDINGS = "local:sentence-transformers/all-MiniLM-L6-v2"
+
+# metadata["source"] label -> file, as filtered on by the GPT planners
+SOURCES = {
+    "diet": "Dietary_Guidelines_for_Americans_2020-2025.pdf",
+    "physical": "Physical_Activity_Guidelines_2nd_edition.docx",
+    "Weight": "Weight Myths.txt",
+    "GymDataset": "GymDataset.csv",
+    "weight_gain": "11 Tips To Build Muscle.html",
+    "weight_loss": "The Science of Weight Loss.html",
+    "Human_Nut": "Human Nutrition, University of Hawai‘i at Mānoa Food Science and Human Nutrition Program.pdf",
+    "Nut_Science": "Nutrition Science and Everyday Application, Alice Callahan, Heather Leonard, Med, Tamberly Powell.pdf",
+}
+
+
+def load_documents(path):
+    # Loaders are imported per format so only the parsers actually needed must be installed
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        from langchain_community.document_loaders import PyMuPDFLoader
+        return PyMuPDFLoader(path).load()
+    if extension == ".docx":
+        from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+        return UnstructuredWordDocumentLoader(path).load()
+    if extension == ".csv":
+        from langchain_community.document_loaders import CSVLoader
+        return CSVLoader(path, encoding="utf-8").load()
+    if extension in (".html", ".htm"):
+        from langchain_community.document_loaders import UnstructuredHTMLLoader
+        return UnstructuredHTMLLoader(path).load()
+    from langchain_community.document_loaders import TextLoader
+    return TextLoader(path, encoding="utf-8").load()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source, text):
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def read_manifest(vector_path):
+    path = os.path.join(vector_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"embeddings": None, "sources": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(vector_path, manifest):
+    with open(os.path.join(vector_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+_worker_embeddings = None
+
+
+def _init_worker(spec):
+    global _worker_embeddings
+    _worker_embeddings = make_embeddings(spec)
+
+
+def _embed_batch(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+def embed_texts(texts, spec, batch_size=64, workers=None):
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) <= 1:
+        embeddings = make_embeddings(spec)
+        return [vector for batch in batches for vector in embeddings.embed_documents(batch)]
+
+    # Local models are CPU-bound: one process per core, each loading the model once.
+    # Remote embeddings are I/O-bound: threads are enough.
+    pool = ProcessPoolExecutor if spec.startswith("local:") else ThreadPoolExecutor
+    with pool(max_workers=min(workers, len(batches)), initializer=_init_worker, initargs=(spec,)) as executor:
+        return [vector for batch in executor.map(_embed_batch, batches) for vector in batch]
+
+
+def publish(vector_path, store, manifest):
+    """Writes the index files and manifest to a temp directory, then swaps it into place, so a reader
+    (shared_resources' hot reload) never sees a new index.faiss next to an old index.pkl or manifest."""
+    vector_path = os.path.abspath(vector_path)
+    staging = f"{vector_path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        if store is not None:
+            store.save_local(staging)
+        write_manifest(staging, manifest)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    previous = f"{vector_path}.old-{os.getpid()}"
+    if os.path.exists(vector_path):
+        os.replace(vector_path, previous)
+    os.replace(staging, vector_path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def build_index(source_dir=SOURCE_DIR, vector_path=VECTOR_PATH, spec=LOCAL_EMBEDDINGS, sources=None,
+                chunk_size=1000, chunk_overlap=200, batch_size=64, workers=None):
+    """Adds new/changed source files to the FAISS index at vector_path; unchanged files are skipped and
+    chunks of sources that were removed (from sources or from disk) are deleted."""
+    sources = sources or SOURCES
+    if not os.path.isdir(source_dir):
+        # Probably a wrong --source-dir: treating every source as deleted would empty the index
+        print(f"Source directory {source_dir} not found; index and manifest left unchanged.")
+        return {"added": 0, "removed": 0, "seconds": 0.0, "docs_per_sec": 0.0}
+
+    manifest = read_manifest(vector_path)
+    # Vectors from different models can't share an index (an index without a manifest is unknown)
+    rebuild = manifest.get("embeddings") != spec
+    if rebuild:
+        if os.path.exists(os.path.join(vector_path, "index.faiss")):
+            print(f"Index was built with {manifest.get('embeddings') or 'unknown embeddings'}; rebuilding with {spec}.")
+        manifest = {"embeddings": None, "sources": {}}
+    original = json.dumps(manifest, sort_keys=True)
+
+    store = None
+    if not rebuild and os.path.exists(os.path.join(vector_path, "index.faiss")):
+        store = FAISS.load_local(vector_path, make_embeddings(spec), allow_dangerous_deserialization=True)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    stale_ids, texts, metadatas, ids = [], [], [], []
+    for source in [source for source in manifest["sources"] if source not in sources]:
+        stale_ids.extend(manifest["sources"].pop(source).get("chunk_ids", ()))
+        print(f" - {source}: no longer a source, removed")
+    for source, filename in sources.items():
+        path = os.path.join(source_dir, filename)
+        if not os.path.exists(path):
+            previous = manifest["sources"].pop(source, None)
+            if previous:
+                stale_ids.extend(previous.get("chunk_ids", ()))
+                print(f" - {source}: missing ({path}), its chunks removed")
+            else:
+                print(f" - {source}: missing ({path}), skipped")
+            continue
+        digest = file_hash(path)
+        previous = manifest["sources"].get(source, {})
+        if previous.get("file_hash") == digest:
+            print(f" - {source}: unchanged")
+            continue
+
+        docs = load_documents(path)
+        for doc in docs:
+            doc.metadata["source"] = source
+        chunks = splitter.split_documents(docs)
+
+        previous_ids = set(previous.get("chunk_ids", ()))
+        new_ids, seen = [], set()
+        for chunk in chunks:
+            cid = chunk_id(source, chunk.page_content)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            new_ids.append(cid)
+            if cid not in previous_ids:
+                texts.append(chunk.page_content)
+                metadatas.append(dict(chunk.metadata, chunk_hash=cid))
+                ids.append(cid)
+        stale_ids.extend(previous_ids - seen)
+        manifest["sources"][source] = {"file": filename, "file_hash": digest, "chunk_ids": new_ids}
+        print(f" - {source}: {len(new_ids)} chunks")
+
+    if store is not None and stale_ids:
+        store.delete(stale_ids)
+
+    started = time.perf_counter()
+    vectors = embed_texts(texts, spec, batch_size=batch_size, workers=workers) if texts else []
+    elapsed = time.perf_counter() - started
+
+    if vectors:
+        pairs = list(zip(texts, vectors))
+        if store is None:
+            store = FAISS.from_embeddings(pairs, make_embeddings(spec), metadatas=metadatas, ids=ids)
+        else:
+            store.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+
+    if store is None and rebuild:
+        # Nothing was embedded with the new spec: recording it would make queries use the new model
+        # against the old index, so the old index and manifest are left as they are
+        print(f"No chunks embedded with {spec}; index and manifest left unchanged.")
+        return {"added": 0, "removed": 0, "seconds": elapsed, "docs_per_sec": 0.0}
+
+    manifest["embeddings"] = spec
+    if vectors or stale_ids or json.dumps(manifest, sort_keys=True) != original:
+        publish(vector_path, store, manifest)
+
+    rate = len(texts) / elapsed if elapsed else 0.0
+    print(f"Embedded {len(texts)} new chunks in {elapsed:.1f}s ({rate:.1f} docs/sec); removed {len(stale_ids)} stale.")
+    return {"added": len(texts), "removed": len(stale_ids), "seconds": elapsed, "docs_per_sec": rate}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or incrementally update the FAISS index used by the GPT planners.")
+    parser.add_argument("--source-dir", default=SOURCE_DIR)
+    parser.add_argument("--vector-path", default=VECTOR_PATH)
+    parser.add_argument("--embeddings", default=LOCAL_EMBEDDINGS,
+                        help='"local:<sentence-transformers model or path>" (offline) or "openai"')
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None, help="Embedding workers (default: one per core)")
+    args = parser.parse_args()
+    build_index(args.source_dir, args.vector_path, args.embeddings, batch_size=args.batch_size, workers=args.workers)
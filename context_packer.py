@@ -0,0 +1,143 @@
+import os
+import re
+from functools import lru_cache
+from metrics import increment
+
+# Max tokens of retrieved context sent with a question (the question and instructions are extra)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+# A chunk that would get fewer tokens than this after trimming is dropped instead
+MIN_CHUNK_TOKENS = 80
+# Word-shingle Jaccard above which two chunks count as the same text (splitter overlap, repeated pages)
+DUPLICATE_SIMILARITY = 0.6
+# Shortest shared prefix/suffix (characters) treated as splitter overlap between neighbouring chunks
+MIN_OVERLAP_CHARS = 50
+MAX_OVERLAP_CHARS = 400
+# Weight of question-term overlap relative to vector similarity when reranking
+LEXICAL_WEIGHT = 0.3
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it of on or that the this to was what when which who why with "
+    "you your my me do does can should will would".split()
+)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken missing, or its encoding file can't be downloaded (offline): estimate instead
+        return None
+
+
+def count_tokens(text, model="gpt-4-turbo"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // 4)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text, max_tokens, model="gpt-4-turbo"):
+    encoding = _encoding(model)
+    if encoding is None:
+        text = text[:max_tokens * 4]
+    else:
+        text = encoding.decode(encoding.encode(text)[:max_tokens])
+    # End on a sentence boundary when one is reasonably close
+    cut = max(text.rfind(". "), text.rfind("\n"))
+    return text[:cut + 1] if cut > len(text) * 0.6 else text
+
+
+def _terms(text):
+    return {word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2 and word not in STOPWORDS}
+
+
+def _shingles(text, size=5):
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def _similarity(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _strip_overlap(text, others):
+    """text minus any head or tail it shares with the chunks already kept (the splitter's chunk_overlap)."""
+    for other in others:
+        longest = min(len(text), len(other), MAX_OVERLAP_CHARS)
+        for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+            if text.startswith(other[-size:]):
+                text = text[size:]
+                break
+        for size in range(min(len(text), len(other), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+            if text.endswith(other[:size]):
+                text = text[:-size]
+                break
+    return text
+
+
+def rerank(results, question):
+    """Orders (doc, L2 distance) pairs by vector similarity blended with question-term overlap."""
+    question_terms = _terms(question)
+    scored = []
+    for i, (doc, distance) in enumerate(results):
+        lexical = len(question_terms & _terms(doc.page_content)) / len(question_terms) if question_terms else 0.0
+        scored.append((1.0 / (1.0 + distance) + LEXICAL_WEIGHT * lexical, i))
+    return [results[i] for _, i in sorted(scored, key=lambda item: (-item[0], item[1]))]
+
+
+def pack_context(results, question, budget=CONTEXT_TOKEN_BUDGET, model="gpt-4-turbo"):
+    """Dedupes, reranks and trims (doc, distance) pairs from filtered_search to fit budget tokens.
+
+    Returns (results, report); trimmed chunks are new Documents, so cache keys built from the result
+    (response_cache.doc_ids) follow what is actually sent.
+    """
+    from langchain.schema import Document
+
+    tokens_in = sum(count_tokens(doc.page_content, model) for doc, _ in results)
+
+    kept, kept_shingles, duplicates = [], [], 0
+    for doc, distance in rerank(results, question):
+        shingles = _shingles(doc.page_content)
+        if any(_similarity(shingles, other) >= DUPLICATE_SIMILARITY for other in kept_shingles):
+            duplicates += 1
+            continue
+        source = doc.metadata.get("source")
+        text = _strip_overlap(doc.page_content, [d.page_content for d, _ in kept if d.metadata.get("source") == source])
+        if text != doc.page_content:
+            doc = Document(page_content=text, metadata=dict(doc.metadata, truncated=True))
+        kept.append((doc, distance))
+        kept_shingles.append(shingles)
+
+    packed, used, trimmed = [], 0, 0
+    for doc, distance in kept:
+        tokens = count_tokens(doc.page_content, model)
+        if used + tokens <= budget:
+            packed.append((doc, distance))
+            used += tokens
+            continue
+        remaining = budget - used
+        if remaining >= MIN_CHUNK_TOKENS:
+            text = truncate_tokens(doc.page_content, remaining, model)
+            packed.append((Document(page_content=text, metadata=dict(doc.metadata, truncated=True)), distance))
+            used += count_tokens(text, model)
+            trimmed += 1
+        break
+
+    report = {
+        "docs_in": len(results),
+        "docs_out": len(packed),
+        "duplicates": duplicates,
+        "trimmed": trimmed,
+        "tokens_in": tokens_in,
+        "tokens_out": used,
+        "tokens_saved": tokens_in - used,
+        "budget": budget,
+    }
+    increment("context_tokens_sent", used)
+    increment("context_tokens_saved", tokens_in - used)
+    return packed, report
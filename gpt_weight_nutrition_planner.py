@@ -1,19 +1,14 @@
 import os
 import textwrap
-from langchain.vectorstores import FAISS
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.chat_models import ChatOpenAI
-from langchain.chains.qa_with_sources import load_qa_with_sources_chain
-from dotenv import load_dotenv
-
-# Load .env file
-load_dotenv()
-
-# Load API Key
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+import shared_resources
+from metrics import timed, span
+from retrieval import filtered_search, VALID_SOURCES
+from context_packer import pack_context
+from response_cache import get_response_cache, doc_ids
 
 class GPTWeightNutritionPlanner:
     def __init__(self, vector_path="vector", model_name="gpt-4-turbo", temperature=0.3):
+        shared_resources.load_env()
         if not os.environ.get("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY not set in environment.")
         self.vector_path = vector_path
@@ -23,12 +18,15 @@ class GPTWeightNutritionPlanner:
         self._load_model()
 
     def _load_vectorstore(self):
-        embeddings = OpenAIEmbeddings()
-        self.vectorstore = FAISS.load_local(self.vector_path, embeddings, allow_dangerous_deserialization=True)
+        # Loaded once per process and shared; hot-reloaded when the vector directory changes
+        shared_resources.get_vectorstore(self.vector_path)
+
+    @property
+    def vectorstore(self):
+        return shared_resources.get_vectorstore(self.vector_path)
 
     def _load_model(self):
-        self.llm = ChatOpenAI(model_name=self.model_name, temperature=self.temperature)
-        self.chain = load_qa_with_sources_chain(self.llm, chain_type="stuff")
+        self.llm, self.chain = shared_resources.get_chain(self.model_name, self.temperature)
 
     def build_prompt(self, age, gender, height_cm, present_weight, target_weight, activity, calories):
         goal = "gain" if target_weight > present_weight else "lose"
@@ -49,16 +47,25 @@ The user wants to {goal} weight.
 2. Suggest dietary and nutritional guidance using the context clearly.
 """
 
-    def generate(self, age, gender, height_cm, present_weight, target_weight, activity, calories):
+    @timed("exercise.retrieve")
+    def retrieve(self, present_weight, target_weight):
         # Focused query for retrieval
         retrieval_query = f"Weekly or dayly physical activity exercises  and nutrition guidance for someone trying to {'gain' if target_weight > present_weight else 'lose'} weight."
         # Retrieve relevant documents
-        docs = self.vectorstore.similarity_search(retrieval_query, k=7)
-        valid_sources = [ "diet", "physical", "Weight", "GymDataset", "weight_gain", "weight_loss","Human_Nut","Nut_Science"]
-        docs = [doc for doc in docs if doc.metadata.get("source") in valid_sources]
+        # Source filter is applied inside the index, so this always yields up to 7 usable chunks
+        store = self.vectorstore
+        with span("exercise.embed"):
+            embedding = store.embedding_function.embed_query(retrieval_query)
+        with span("exercise.faiss_search"):
+            results = filtered_search(store, embedding, k=7, sources=VALID_SOURCES)
+        # Only what fits the token budget goes into the stuff prompt
+        with span("exercise.pack_context"):
+            results, self.context_report = pack_context(results, retrieval_query)
+        docs = [doc for doc, _ in results]
         print("📄 Retrieved Sources:")
         for doc in docs:
             print(" -", doc.metadata.get("source"))
+        print(f"🧮 Context: {self.context_report['tokens_out']} tokens sent, {self.context_report['tokens_saved']} saved")
 
         # Build readable summaries
         doc_summaries = []
@@ -67,10 +74,29 @@ The user wants to {goal} weight.
             snippet = doc.page_content[:600].strip().replace("\n", " ") + "..."
             doc_summaries.append(f"**Chunk {i+1} — Source:** {source}\n{textwrap.fill(snippet, width=100)}")
 
+        return docs, doc_summaries
+
+    @timed("exercise.generate")
+    def generate(self, age, gender, height_cm, present_weight, target_weight, activity, calories):
+        docs, doc_summaries = self.retrieve(present_weight, target_weight)
+
         # Build personalized prompt
         prompt = self.build_prompt(age, gender, height_cm, present_weight, target_weight, activity, calories)
 
         # Call GPT with retrieved context and full prompt
-        response = self.chain.run({"input_documents": docs, "question": prompt})
+        cache = get_response_cache()
+        key = cache.make_key(self.model_name, prompt, doc_ids(docs), temperature=self.temperature)
+        response = cache.get_or_call(key, lambda: self.chain.run({"input_documents": docs, "question": prompt}))
 
         return prompt.strip(), response.strip(), doc_summaries
+
+    @timed("exercise.generate_stream")
+    def generate_stream(self, age, gender, height_cm, present_weight, target_weight, activity, calories):
+        # Yields response tokens; self.prompt and self.doc_summaries are set before the first one
+        docs, self.doc_summaries = self.retrieve(present_weight, target_weight)
+        prompt = self.build_prompt(age, gender, height_cm, present_weight, target_weight, activity, calories)
+        self.prompt = prompt.strip()
+
+        cache = get_response_cache()
+        key = cache.make_key(self.model_name, prompt, doc_ids(docs), temperature=self.temperature)
+        yield from cache.cached_stream(key, lambda: shared_resources.stream_chain(self.llm, self.chain, docs, prompt))
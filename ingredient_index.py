@@ -0,0 +1,113 @@
+import re
+import threading
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# A term like "nuts" or "dairy" expands to its group; matching errs toward excluding ("coconut milk" counts as dairy)
+ALLERGEN_GROUPS = {
+    "dairy": ["milk", "butter", "cheese", "cream", "yogurt", "yoghurt", "ghee", "whey", "buttermilk"],
+    "gluten": ["wheat", "flour", "bread", "pasta", "barley", "rye", "couscous", "noodles", "breadcrumbs"],
+    "nuts": ["almond", "walnut", "pecan", "cashew", "hazelnut", "pistachio", "macadamia", "peanut", "nut"],
+    "shellfish": ["shrimp", "prawn", "crab", "lobster", "scallop", "clam", "mussel", "oyster"],
+    "egg": ["egg", "mayonnaise", "meringue"],
+    "soy": ["soy", "soya", "tofu", "tempeh", "edamame", "miso"],
+}
+# Counted as available when scoring pantry coverage, whether or not the user lists them (exact names only)
+PANTRY_STAPLES = ("salt", "pepper", "black pepper", "water", "sugar", "oil", "olive oil", "vegetable oil")
+
+
+def normalize(term):
+    return " ".join(str(term).lower().split())
+
+
+def split_terms(text):
+    """"Peanuts, milk;  Soy" -> ["peanuts", "milk", "soy"]; lists pass through normalized."""
+    if text is None:
+        return []
+    items = re.split(r"[,;\n]", text) if isinstance(text, str) else text
+    return [term for term in (normalize(item) for item in items) if term]
+
+
+class IngredientIndex:
+    """Inverted index from interned ingredient tokens to recipe row positions.
+
+    Built from a RecipeDataset's CSR arrays (vocabulary, offsets, codes); postings are stored the same
+    way, so a query is a few array slices OR'd into a boolean row mask rather than a pass over list cells.
+    """
+
+    def __init__(self, vocabulary, offsets, codes):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.codes = codes
+        self.size = len(offsets) - 1
+
+        lengths = np.diff(offsets)
+        owners = np.repeat(np.arange(self.size, dtype=np.int32), lengths)
+        order = np.argsort(codes, kind='stable')
+        self.postings = owners[order]
+        counts = np.bincount(codes, minlength=len(vocabulary))
+        self.posting_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self._vocabulary_array = pa.array(vocabulary.tolist(), type=pa.string())
+        self._staples = np.flatnonzero(np.isin(vocabulary, PANTRY_STAPLES))
+        self._matches = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        return cls(dataset.ingredient_vocab, dataset.ingredient_offsets, dataset.ingredient_codes)
+
+    def expand(self, terms):
+        expanded = []
+        for term in split_terms(terms):
+            expanded.extend(ALLERGEN_GROUPS.get(term, [term]))
+        return expanded
+
+    def tokens(self, term):
+        """Vocabulary codes of ingredients containing term as a whole word (plural 's'/'es' allowed)."""
+        term = normalize(term)
+        with self._lock:
+            if term not in self._matches:
+                pattern = rf"(^|[^a-z]){re.escape(term)}(s|es)?([^a-z]|$)"
+                hits = pc.match_substring_regex(self._vocabulary_array, pattern)
+                self._matches[term] = np.flatnonzero(hits.to_numpy(zero_copy_only=False)).astype(np.int32)
+            return self._matches[term]
+
+    def token_codes(self, terms):
+        codes = [self.tokens(term) for term in self.expand(terms)]
+        return np.unique(np.concatenate(codes)) if codes else np.empty(0, dtype=np.int32)
+
+    def mask(self, terms):
+        """Boolean row mask of recipes using any of terms."""
+        mask = np.zeros(self.size, dtype=bool)
+        for code in self.token_codes(terms):
+            mask[self.postings[self.posting_offsets[code]:self.posting_offsets[code + 1]]] = True
+        return mask
+
+    def query(self, include=None, exclude=None, include_all=None):
+        """Row mask of recipes using any of include, every one of include_all and none of exclude.
+        Unset arguments don't constrain; the result is None when nothing constrains."""
+        if not (split_terms(include) or split_terms(exclude) or split_terms(include_all)):
+            return None
+        allowed = np.ones(self.size, dtype=bool)
+        if split_terms(include):
+            allowed &= self.mask(include)
+        for term in split_terms(include_all):
+            allowed &= self.mask([term])
+        if split_terms(exclude):
+            allowed &= ~self.mask(exclude)
+        return allowed
+
+    def coverage(self, positions, pantry):
+        """Share of each recipe's ingredients (at positions) that the pantry or PANTRY_STAPLES cover."""
+        positions = np.asarray(positions, dtype=np.int64)
+        available = np.zeros(len(self.vocabulary), dtype=bool)
+        available[self.token_codes(pantry)] = True
+        available[self._staples] = True
+
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        owners = np.repeat(np.arange(len(positions)), lengths)
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        hits = available[self.codes[np.repeat(starts, lengths) + within]]
+        return np.bincount(owners, weights=hits, minlength=len(positions)) / np.maximum(lengths, 1)
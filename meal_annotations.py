@@ -0,0 +1,161 @@
+import json
+import logging
+import shared_resources
+from metrics import record_usage, span, increment
+from response_cache import get_response_cache
+
+ANNOTATION_MODEL = "gpt-3.5-turbo"
+# Bump when the prompt or schema changes so cached annotations are not reused across versions
+ANNOTATION_VERSION = 1
+# A week of four slots fits in one request
+MAX_MEALS_PER_REQUEST = 28
+TOKENS_PER_MEAL = 60
+
+logger = logging.getLogger(__name__)
+
+MAX_NAME_LENGTH = 80
+MAX_TEXT_LENGTH = 240
+
+SYSTEM_PROMPT = (
+    "You annotate recipes for a meal planner. Reply with a JSON object only, shaped as "
+    '{"meals": [{"id": <recipe id>, "name": "<more appealing dish name>", '
+    '"tip": "<one-line recommendation, e.g. reduce oil, boost protein>", '
+    '"calorie_warning": "<ingredient that makes the dish calorie-dense, or null>"}]} '
+    "with exactly one entry per recipe id given."
+)
+
+
+def _recipe_line(meal):
+    ingredients = ", ".join(list(meal["ingredients"])[:5])
+    return f"id={int(meal['id'])} | {meal['name']} | {meal['diet_type']} | {int(meal['calories'])} kcal | {ingredients}"
+
+
+def annotation_prompt(meals):
+    return "Recipes:\n" + "\n".join(_recipe_line(meal) for meal in meals)
+
+
+def fallback_annotation(meal):
+    """Deterministic annotation from the recipe's own numbers, used when the model is unavailable or invalid."""
+    name = str(meal["name"]).strip().title()
+    if meal["protein"] < 10:
+        tip = "Add a protein side such as eggs, yogurt, tofu or beans."
+    elif meal["total_fat"] > 35:
+        tip = "Use less oil or butter when cooking."
+    elif meal["sodium"] > 30:
+        tip = "Go easy on added salt."
+    elif meal["sugar"] > 15:
+        tip = "Cut back on added sugar or sweet toppings."
+    else:
+        tip = "Balanced choice; keep to the listed portions."
+    warning = None
+    if meal["total_fat"] > 50:
+        warning = "High fat content makes this dish calorie-dense."
+    return {"name": name, "tip": tip, "calorie_warning": warning, "source": "fallback"}
+
+
+def _clean_text(value, limit):
+    if not isinstance(value, str):
+        return None
+    value = " ".join(value.split())
+    return value[:limit] if value else None
+
+
+def parse_annotations(text, ids):
+    """Valid {"name", "tip", "calorie_warning"} entries by recipe id; anything malformed or unknown is dropped."""
+    try:
+        payload = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    entries = payload.get("meals") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return {}
+
+    wanted = set(ids)
+    annotations = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            recipe_id = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        name = _clean_text(entry.get("name"), MAX_NAME_LENGTH)
+        tip = _clean_text(entry.get("tip"), MAX_TEXT_LENGTH)
+        if recipe_id not in wanted or recipe_id in annotations or not name or not tip:
+            continue
+        warning = _clean_text(entry.get("calorie_warning"), MAX_TEXT_LENGTH)
+        if warning and warning.lower() in ("null", "none", "n/a"):
+            warning = None
+        annotations[recipe_id] = {"name": name, "tip": tip, "calorie_warning": warning, "source": "llm"}
+    return annotations
+
+
+def annotation_request(meals):
+    """Chat completion arguments for one batch of meals, as sent to the API."""
+    return {
+        "model": ANNOTATION_MODEL,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT},
+                     {"role": "user", "content": annotation_prompt(meals)}],
+        "response_format": {"type": "json_object"},
+        "max_tokens": TOKENS_PER_MEAL * len(meals) + 20,
+        "temperature": 0.3,
+    }
+
+
+def _request(request, api_key):
+    client = shared_resources.get_openai_client(api_key)
+    response = client.chat.completions.create(**request)
+    record_usage(ANNOTATION_MODEL, response.usage)
+    return response.choices[0].message.content
+
+
+def _cache_key(cache, recipe_id):
+    return cache.make_key(ANNOTATION_MODEL, f"meal-annotation:{recipe_id}", version=ANNOTATION_VERSION)
+
+
+def annotate_meals(meals, api_key=None, batch_size=MAX_MEALS_PER_REQUEST, sent=None):
+    """Annotations by recipe id for meal rows (dicts or Series with id, name, diet_type, calories, ingredients
+    and macros). Cached per recipe, so a recipe is only ever sent to the model once; every id gets an entry.
+    The request of each batch actually sent is appended to the list sent, when given."""
+    unique = {}
+    for meal in meals:
+        unique.setdefault(int(meal["id"]), meal)
+
+    cache = get_response_cache()
+    annotations, missing = {}, []
+    for recipe_id, meal in unique.items():
+        cached = cache.get(_cache_key(cache, recipe_id))
+        if cached is not None:
+            annotations[recipe_id] = dict(cached, source="cache")
+        else:
+            missing.append(meal)
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        ids = [int(meal["id"]) for meal in batch]
+        request = annotation_request(batch)
+        if sent is not None:
+            sent.append(request)
+        try:
+            with span("meal.annotations_request"):
+                parsed = parse_annotations(_request(request, api_key), ids)
+        except Exception:
+            logger.warning("Meal annotation request failed, using fallback", exc_info=True)
+            increment("meal_annotation_failures")
+            parsed = {}
+        for recipe_id, annotation in parsed.items():
+            cache.set(_cache_key(cache, recipe_id), {k: v for k, v in annotation.items() if k != "source"})
+        annotations.update(parsed)
+
+    for recipe_id, meal in unique.items():
+        if recipe_id not in annotations:
+            # Not cached: the model may do better next time
+            annotations[recipe_id] = fallback_annotation(meal)
+    return annotations
+
+
+def format_annotation(annotation):
+    text = f"{annotation['name']} — {annotation['tip']}"
+    if annotation.get("calorie_warning"):
+        text += f" ⚠️ {annotation['calorie_warning']}"
+    return text
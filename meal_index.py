@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+def _label_codes(series):
+    """(codes, labels): integer codes per row into lowercase labels; -1 for missing. Categorical columns
+    (the compact recipe table) are used as-is, so no per-row strings are built or compared."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    labels, remap = np.unique(np.asarray(series.cat.categories.astype(str).str.lower(), dtype=object),
+                              return_inverse=True)
+    codes = series.cat.codes.to_numpy()
+    return np.where(codes >= 0, remap[np.maximum(codes, 0)], -1), labels
+
+
+class MealIndex:
+    """Calorie-sorted candidate arrays per (meal_type, diet_type), built once per recipe table."""
+
+    def __init__(self, df, max_sugar=20):
+        self.max_sugar = max_sugar
+        self.groups = {}
+
+        meal_codes, meal_labels = _label_codes(df['meal_type'])
+        diet_codes, diet_labels = _label_codes(df['diet_type'])
+        keep = np.flatnonzero((df['sugar'] <= max_sugar).to_numpy() & (meal_codes >= 0) & (diet_codes >= 0))
+        meal_codes, diet_codes = meal_codes[keep], diet_codes[keep]
+        calories = df['calories'].to_numpy(dtype=np.float64)[keep]
+        total_fat = df['total_fat'].to_numpy(dtype=np.float64)[keep]
+        protein = df['protein'].to_numpy(dtype=np.float64)[keep]
+
+        # Same preference as the old sort: closest calories, then least fat, then most protein
+        order = np.lexsort((-protein, total_fat, calories, diet_codes, meal_codes))
+        meal_codes, diet_codes = meal_codes[order], diet_codes[order]
+        positions, calories = keep[order], calories[order]
+
+        boundaries = np.flatnonzero((meal_codes[1:] != meal_codes[:-1]) | (diet_codes[1:] != diet_codes[:-1])) + 1
+        starts = np.concatenate(([0], boundaries)) if len(order) else np.array([], dtype=int)
+        ends = np.concatenate((boundaries, [len(order)])) if len(order) else np.array([], dtype=int)
+        for start, end in zip(starts, ends):
+            # Query strings resolve through this dict, so labels are only looked at once per group
+            key = (meal_labels[meal_codes[start]], diet_labels[diet_codes[start]])
+            self.groups[key] = (calories[start:end], positions[start:end])
+
+    def candidates(self, meal_type, diet_type, allowed=None):
+        """(calories, positions) for the group, restricted to rows where the boolean mask allowed is set."""
+        group = self.groups.get((meal_type.lower(), diet_type.lower()))
+        if group is None or allowed is None:
+            return group
+        calories, positions = group
+        keep = allowed[positions]
+        if not keep.any():
+            return None
+        return calories[keep], positions[keep]
+
+    def closest(self, meal_type, diet_type, target_kcal, allowed=None):
+        """Row position (into the indexed DataFrame) of the best match, or None."""
+        group = self.candidates(meal_type, diet_type, allowed)
+        if group is None:
+            return None
+        calories, positions = group
+
+        right = np.searchsorted(calories, target_kcal, side='left')
+        best = None
+        if right < len(calories):
+            best = right
+        if right > 0:
+            # First entry of the run just below target keeps the fat/protein tie-break
+            left = np.searchsorted(calories, calories[right - 1], side='left')
+            if best is None or target_kcal - calories[left] <= calories[best] - target_kcal:
+                best = left
+        return int(positions[best])
+
+    def nearest(self, meal_type, diet_type, target_kcal, size, allowed=None):
+        """Row positions of up to `size` candidates closest to target_kcal, best first."""
+        group = self.candidates(meal_type, diet_type, allowed)
+        if group is None:
+            return np.array([], dtype=int)
+        calories, positions = group
+
+        center = np.searchsorted(calories, target_kcal, side='left')
+        lo, hi = max(center - size, 0), min(center + size, len(calories))
+        order = np.argsort(np.abs(calories[lo:hi] - target_kcal), kind='stable')[:size]
+        return positions[lo:hi][order]
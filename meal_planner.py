@@ -1,84 +1,231 @@
 import pandas as pd
-import ast
-import streamlit as st
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-
-# Load .env file
-load_dotenv()
+import numpy as np
+import json
+from metrics import timed, span
+from recipe_dataset import RecipeDataset
+from ingredient_index import split_terms
+from meal_annotations import annotate_meals, format_annotation
+
+MEAL_STRUCTURE = {
+    'breakfast': 0.25,
+    'snack': 0.1,
+    'lunch': 0.35,
+    'dinner': 0.30
+}
+
+# Recipe macros are % daily value; convert energy shares via the reference grams behind them
+DAILY_VALUE_GRAMS = {'protein': 50, 'total_fat': 65, 'carbohydrates': 300}
+KCAL_PER_GRAM = {'protein': 4, 'total_fat': 9, 'carbohydrates': 4}
+DEFAULT_MACRO_SPLIT = {'protein': 0.30, 'total_fat': 0.30, 'carbohydrates': 0.40}
+
+# With a pantry, the best-covered of this many nearest candidates within the tolerance of the slot's calories wins
+PANTRY_CANDIDATES = 20
+PANTRY_CALORIE_TOLERANCE = 0.15
 
 class MealPlanner:
-    def __init__(self, df, total_calories=2000, diet_type="vegan", api_key=os.getenv("OPENAI_API_KEY")):
-        self.df = df.copy()
+    def __init__(self, df, total_calories=2000, diet_type="vegan", api_key=None, index=None,
+                 exclude_ingredients=None, include_ingredients=None, pantry=None):
+        # A RecipeDataset is shared as-is (never copied per session); a plain DataFrame gets its own
+        self.dataset = df if isinstance(df, RecipeDataset) else RecipeDataset(df)
+        self.df = self.dataset.df
+        # A shared index must have been built over a table with the same row order as df
+        self.index = index
         self.total_calories = total_calories
         self.diet_type = diet_type
         self.api_key = api_key
+        # Comma-separated strings or lists; exclusions may name allergen groups such as "nuts" or "dairy"
+        self.exclude_ingredients = split_terms(exclude_ingredients)
+        self.include_ingredients = split_terms(include_ingredients)
+        self.pantry = split_terms(pantry)
+        self.allowed = None
         self.selected_meals_df = pd.DataFrame()
-
-    def _safe_parse_list(self, x):
-        try:
-            parsed = ast.literal_eval(x) if isinstance(x, str) else x
-            return parsed if isinstance(parsed, list) else [str(parsed)]
-        except:
-            return [str(x)]
-
+        self.week_plan_df = pd.DataFrame()
+        self.week_warnings = []
+        self.annotation_requests = None
+
+    def allowed_rows(self):
+        """Boolean row mask from the ingredient options, or None when they don't restrict anything."""
+        if self.allowed is None and (self.exclude_ingredients or self.include_ingredients):
+            with span("meal.ingredient_filter"):
+                self.allowed = self.dataset.ingredient_index.query(include=self.include_ingredients,
+                                                                   exclude=self.exclude_ingredients)
+        return self.allowed
+
+    def _closest(self, meal_type, target_kcal, allowed):
+        if not self.pantry:
+            return self.index.closest(meal_type, self.diet_type, target_kcal, allowed)
+        positions = self.index.nearest(meal_type, self.diet_type, target_kcal, PANTRY_CANDIDATES, allowed)
+        if not len(positions):
+            return None
+        calories = self.dataset.column('calories')[positions]
+        coverage = self.dataset.ingredient_index.coverage(positions, self.pantry)
+        coverage[np.abs(calories - target_kcal) > PANTRY_CALORIE_TOLERANCE * target_kcal] = -1
+        # Ties (and no candidate within tolerance) fall back to the calorie-nearest one
+        return int(positions[np.argmax(coverage)])
+
+    @timed("meal.prepare_data")
     def prepare_data(self):
-        self.df['ingredients'] = self.df['ingredients'].apply(self._safe_parse_list)
-        self.df['steps'] = self.df['steps'].apply(self._safe_parse_list)
+        # List columns are parsed once when the RecipeDataset is built; the shared table is never modified here
+        if self.index is None:
+            self.index = self.dataset.index
 
+    @timed("meal.select_meals")
     def select_meals(self):
-        meal_structure = {
-            'breakfast': 0.25,
-            'snack': 0.1,
-            'lunch': 0.35,
-            'dinner': 0.30
-        }
+        meal_structure = MEAL_STRUCTURE
 
+        if self.index is None:
+            with span("meal.index_build"):
+                self.index = self.dataset.index
+
+        allowed = self.allowed_rows()
         selected_meals = []
-        self.prompt = f"Create a personalized 1-day meal plan for a {self.diet_type} diet with a total of {self.total_calories} kcal.\n\nHere is the proposed structure with ingredients and estimated calories:\n\n"
+        self.prompt = f"Create a personalized 1-day meal plan for a {self.diet_type} diet with a total of {self.total_calories} kcal.\n\n"
+        if self.exclude_ingredients:
+            self.prompt += f"Avoid these ingredients: {', '.join(self.exclude_ingredients)}.\n"
+        if self.pantry:
+            self.prompt += f"Prefer ingredients already at hand: {', '.join(self.pantry)}.\n"
+        self.prompt += "Here is the proposed structure with ingredients and estimated calories:\n\n"
 
         for meal, ratio in meal_structure.items():
             base_type = 'snack' if 'snack' in meal else meal
             target_kcal = self.total_calories * ratio
 
-            matches = self.df[
-                (self.df['meal_type'].str.lower() == base_type.lower()) &
-                (self.df['diet_type'].str.lower() == self.diet_type.lower())
-            ]
-
-            matches = matches[matches['sugar'] <= 20]
+            position = self._closest(base_type, target_kcal, allowed)
 
-            if not matches.empty:
-                matches_sorted = matches.sort_values(by=['total_fat', 'protein', 'calories'], ascending=[True, False, True])
-                closest = matches_sorted.iloc[(matches_sorted['calories'] - target_kcal).abs().argsort()[:1]]
-                row = closest.iloc[0]
+            if position is not None:
+                row = self.df.iloc[position]
                 selected_meals.append(row)
                 self.prompt += f"• {base_type.title()} ({int(row['calories'])} kcal): Ingredients: {', '.join(row['ingredients'][:5])}\n"
 
         self.selected_meals_df = pd.DataFrame(selected_meals).reset_index(drop=True)
 
+    def macro_targets(self, macro_split=None):
+        macro_split = macro_split or DEFAULT_MACRO_SPLIT
+        return {
+            macro: self.total_calories * share / KCAL_PER_GRAM[macro] / DAILY_VALUE_GRAMS[macro] * 100
+            for macro, share in macro_split.items()
+        }
+
+    @timed("meal.select_week")
+    def select_week(self, days=7, candidates_per_slot=12, macro_split=None, macro_weight=0.5, pantry_weight=0.05):
+        if self.index is None:
+            self.index = self.dataset.index
+        allowed = self.allowed_rows()
+        self.week_warnings = []
+
+        # Per slot, keep the candidates nearest to that slot's calorie share
+        size = max(candidates_per_slot, days)
+        slots, slot_positions = [], []
+        for meal, ratio in MEAL_STRUCTURE.items():
+            positions = self.index.nearest(meal, self.diet_type, self.total_calories * ratio, size, allowed)
+            if len(positions):
+                slots.append(meal)
+                slot_positions.append(positions)
+            else:
+                self.week_warnings.append(f"No {meal} recipes match this diet and these ingredient options.")
+
+        if not slots:
+            self.week_plan_df = pd.DataFrame()
+            return self.week_plan_df
+
+        # Score every combination of one candidate per slot at once: shape (k1, k2, ..., kn)
+        macro_targets = self.macro_targets(macro_split)
+        columns = ['calories'] + list(macro_targets)
+        totals = {col: 0 for col in columns}
+        for axis, positions in enumerate(slot_positions):
+            shape = [1] * len(slots)
+            shape[axis] = len(positions)
+            for col in columns:
+                values = self.dataset.column(col)[positions]
+                totals[col] = totals[col] + values.reshape(shape)
+
+        score = ((totals['calories'] - self.total_calories) / self.total_calories) ** 2
+        for macro, target in macro_targets.items():
+            score = score + macro_weight * ((totals[macro] - target) / target) ** 2 / len(macro_targets)
+        if self.pantry:
+            # Mean pantry coverage over the day's meals, as a bonus
+            for axis, positions in enumerate(slot_positions):
+                shape = [1] * len(slots)
+                shape[axis] = len(positions)
+                coverage = self.dataset.ingredient_index.coverage(positions, self.pantry)
+                score = score - pantry_weight * coverage.reshape(shape) / len(slots)
+
+        # Walk combos best-first and keep the first ones that share no recipe with earlier days
+        order = np.argsort(score, axis=None, kind='stable')
+        used, chosen = set(), []
+        for flat in order:
+            picks = [int(positions[i]) for positions, i in zip(slot_positions, np.unravel_index(flat, score.shape))]
+            if used.intersection(picks):
+                continue
+            used.update(picks)
+            chosen.append(flat)
+            if len(chosen) == days:
+                break
+
+        if len(chosen) < days:
+            # Too few candidates for distinct days: fill with the best remaining combos (repeating
+            # recipes), and with repeated days if there are fewer combos than days, rather than a short week
+            self.week_warnings.append(f"Only {len(chosen)} day(s) without repeated recipes; the rest reuse recipes.")
+            taken = set(chosen)
+            chosen += [flat for flat in order if flat not in taken][:days - len(chosen)]
+            chosen += [chosen[i % len(chosen)] for i in range(days - len(chosen))]
+
+        combos = np.unravel_index(np.asarray(chosen), score.shape)
+        # (days, slots) row positions, gathered in one take instead of a row copy per meal
+        picks = np.stack([positions[axis] for positions, axis in zip(slot_positions, combos)], axis=1)
+        week_df = self.df.iloc[picks.ravel()].reset_index(drop=True)
+        week_df['day'] = np.repeat(np.arange(1, days + 1), len(slots))
+        week_df['slot'] = np.tile(slots, days)
+        self.week_plan_df = week_df
+        return self.week_plan_df
+
+    def week_summary(self):
+        columns = ['calories', 'protein', 'total_fat', 'carbohydrates']
+        return self.week_plan_df.groupby('day')[columns].sum().astype(float).round(1)
+
+    def _apply_annotations(self, meals_df, annotations):
+        if meals_df.empty:
+            return
+        notes = [annotations[int(recipe_id)] for recipe_id in meals_df['id']]
+        meals_df['gpt_name'] = [note['name'] for note in notes]
+        meals_df['gpt_tip'] = [note['tip'] for note in notes]
+        meals_df['calorie_warning'] = [note['calorie_warning'] for note in notes]
+        meals_df['gpt_name_and_tip'] = [format_annotation(note) for note in notes]
+
+    @timed("meal.annotations")
     def generate_gpt_annotations(self):
-        if "Your task:" not in self.prompt:
-          self.prompt += (
-            "\nYour task:"
-            "\n1. Generate a more appealing name for each meal."
-            "\n2. Write a brief 1-line recommendation for each (e.g., reduce oil, boost protein)."
-            "\n3. If any ingredient pushes the calories too high, mention that.")
-
-        client = OpenAI(api_key=self.api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": self.prompt}],
-            max_tokens=500
-        )
-        gpt_output = response.choices[0].message.content
-        gpt_lines = [line for line in gpt_output.strip().split("\n") if line.strip()]
-        self.selected_meals_df['gpt_name_and_tip'] = gpt_lines[:len(self.selected_meals_df)]
+        # Structured per-recipe annotations: aligned by recipe id and cached per recipe
+        if self.selected_meals_df.empty:
+            return
+        meals = [row for _, row in self.selected_meals_df.iterrows()]
+        self.annotation_requests = []
+        self._apply_annotations(self.selected_meals_df, annotate_meals(meals, self.api_key, sent=self.annotation_requests))
+
+    @timed("meal.annotations_week")
+    def annotate_week(self):
+        # All days go out in one batched request (recipes already annotated come from the cache)
+        if self.week_plan_df.empty:
+            return self.week_plan_df
+        meals = [row for _, row in self.week_plan_df.iterrows()]
+        self._apply_annotations(self.week_plan_df, annotate_meals(meals, self.api_key))
+        return self.week_plan_df
+
+    @timed("meal.annotations_stream")
+    def generate_stream(self):
+        # JSON output is only usable once complete, so this yields one finished line per meal
+        self.generate_gpt_annotations()
+        for _, row in self.selected_meals_df.iterrows():
+            yield f"**{str(row['meal_type']).title()}:** {row['gpt_name_and_tip']}\n\n"
 
     def display_plan(self):
-        st.subheader("Prompt Sent to Model")
-        st.text_area("Prompt", self.prompt, height=200)
+        import streamlit as st
+
+        if self.annotation_requests is not None:
+            with st.expander("Annotation Request Sent to Model"):
+                if not self.annotation_requests:
+                    st.caption("Every recipe was already annotated: served from the cache, nothing was sent.")
+                for request in self.annotation_requests:
+                    st.code(json.dumps(request, indent=2, ensure_ascii=False), language="json")
 
         st.subheader("🍉🍓🍒🥝🍌Final Meal Plan🍉🍓🍒🥝🍌")
         for i, row in self.selected_meals_df.iterrows():
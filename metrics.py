@@ -0,0 +1,228 @@
+import inspect
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# USD per 1K tokens as (prompt, completion); unknown models are counted in tokens but not cost
+MODEL_PRICES = {
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+# Histogram upper bounds (seconds) for stage timings
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_SPANS = 200
+
+
+def model_price(model):
+    # Dated snapshots ("gpt-4-turbo-2024-04-09") are priced like their family
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+class Metrics:
+    """In-process counters for stage timings, LLM token usage/cost and cache hit ratios."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._caches = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.llm_calls = defaultdict(int)
+            self.tokens = defaultdict(int)
+            self.cost = defaultdict(float)
+            self.counters = defaultdict(float)
+            self.recent = deque(maxlen=RECENT_SPANS)
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {"count": 0, "errors": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+            self.recent.append({"stage": stage, "seconds": seconds, "error": error, "at": time.time(),
+                                "depth": len(getattr(self._local, "stack", ()))})
+
+    @contextmanager
+    def span(self, stage):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(stage)
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except GeneratorExit:
+            # A consumer closing a stream early (timed generators) is a normal finish
+            raise
+        except BaseException:
+            error = True
+            raise
+        finally:
+            stack.pop()
+            self.observe(stage, time.perf_counter() - started, error)
+
+    def record_usage(self, model, prompt_tokens, completion_tokens):
+        prompt_tokens, completion_tokens = int(prompt_tokens or 0), int(completion_tokens or 0)
+        price = model_price(model)
+        with self._lock:
+            self.llm_calls[model] += 1
+            self.tokens[(model, "prompt")] += prompt_tokens
+            self.tokens[(model, "completion")] += completion_tokens
+            if price:
+                self.cost[model] += (prompt_tokens * price[0] + completion_tokens * price[1]) / 1000
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def register_cache(self, name, stats):
+        """stats() must return a dict with hits, misses and hit_ratio (entries optional)."""
+        with self._lock:
+            self._caches[name] = stats
+
+    def cache_stats(self):
+        with self._lock:
+            caches = dict(self._caches)
+        return {name: stats() for name, stats in caches.items()}
+
+    def snapshot(self):
+        with self._lock:
+            stages = {
+                stage: {"count": e["count"], "errors": e["errors"], "total_s": e["sum"],
+                        "mean_s": e["sum"] / e["count"], "max_s": e["max"]}
+                for stage, e in self.stages.items()
+            }
+            usage = {
+                model: {"calls": calls, "prompt_tokens": self.tokens[(model, "prompt")],
+                        "completion_tokens": self.tokens[(model, "completion")], "cost_usd": self.cost.get(model, 0.0)}
+                for model, calls in self.llm_calls.items()
+            }
+            counters = dict(self.counters)
+            recent = list(self.recent)
+        return {"stages": stages, "llm": usage, "counters": counters, "caches": self.cache_stats(), "recent": recent}
+
+    def prometheus_text(self):
+        snap = self.snapshot()
+        with self._lock:
+            stages = {stage: dict(e, buckets=list(e["buckets"])) for stage, e in self.stages.items()}
+        lines = ["# HELP planner_stage_seconds Wall time per planner stage.", "# TYPE planner_stage_seconds histogram"]
+        for stage, e in sorted(stages.items()):
+            for bound, count in zip(BUCKETS, e["buckets"]):
+                lines.append(f'planner_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'planner_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {e["count"]}')
+            lines.append(f'planner_stage_seconds_sum{{stage="{stage}"}} {e["sum"]}')
+            lines.append(f'planner_stage_seconds_count{{stage="{stage}"}} {e["count"]}')
+        lines += ["# HELP planner_stage_errors_total Stages that raised.", "# TYPE planner_stage_errors_total counter"]
+        lines += [f'planner_stage_errors_total{{stage="{stage}"}} {e["errors"]}' for stage, e in sorted(stages.items())]
+
+        lines += ["# HELP llm_calls_total LLM API calls.", "# TYPE llm_calls_total counter"]
+        lines += [f'llm_calls_total{{model="{model}"}} {u["calls"]}' for model, u in sorted(snap["llm"].items())]
+        lines += ["# HELP llm_tokens_total LLM tokens by kind.", "# TYPE llm_tokens_total counter"]
+        for model, u in sorted(snap["llm"].items()):
+            lines.append(f'llm_tokens_total{{model="{model}",kind="prompt"}} {u["prompt_tokens"]}')
+            lines.append(f'llm_tokens_total{{model="{model}",kind="completion"}} {u["completion_tokens"]}')
+        lines += ["# HELP llm_cost_usd_total Estimated LLM spend.", "# TYPE llm_cost_usd_total counter"]
+        lines += [f'llm_cost_usd_total{{model="{model}"}} {u["cost_usd"]}' for model, u in sorted(snap["llm"].items())]
+
+        lines += ["# HELP cache_requests_total Cache lookups by result.", "# TYPE cache_requests_total counter"]
+        for name, stats in sorted(snap["caches"].items()):
+            lines.append(f'cache_requests_total{{cache="{name}",result="hit"}} {stats.get("hits", 0)}')
+            lines.append(f'cache_requests_total{{cache="{name}",result="miss"}} {stats.get("misses", 0)}')
+        lines += ["# HELP cache_hit_ratio Hits / lookups since start.", "# TYPE cache_hit_ratio gauge"]
+        lines += [f'cache_hit_ratio{{cache="{name}"}} {stats.get("hit_ratio", 0.0)}' for name, stats in sorted(snap["caches"].items())]
+        for name, value in sorted(snap["counters"].items()):
+            lines += [f"# TYPE planner_{name}_total counter", f"planner_{name}_total {value}"]
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def span(stage):
+    return _metrics.span(stage)
+
+
+def timed(stage):
+    """Decorator form of span(); generator functions are timed over their whole iteration,
+    with time to the first item recorded as "<stage>.first_token"."""
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @wraps(fn)
+            def generator(*args, **kwargs):
+                with _metrics.span(stage):
+                    started = time.perf_counter()
+                    first = True
+                    for item in fn(*args, **kwargs):
+                        if first:
+                            _metrics.observe(f"{stage}.first_token", time.perf_counter() - started)
+                            first = False
+                        yield item
+            return generator
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _metrics.span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(model, usage):
+    """Accepts an OpenAI usage object or a {"prompt_tokens", "completion_tokens"} dict; None is ignored."""
+    if usage is None:
+        return
+    if isinstance(usage, dict):
+        _metrics.record_usage(model, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+    else:
+        _metrics.record_usage(model, getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
+
+
+def increment(name, value=1):
+    _metrics.increment(name, value)
+
+
+def register_cache(name, stats):
+    _metrics.register_cache(name, stats)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = _metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serves GET /metrics in Prometheus text format from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
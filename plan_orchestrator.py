@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+
+# One bounded pool per process caps concurrent LLM requests across all sessions
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+DEFAULT_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", 60))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="llm")
+        return _executor
+
+
+class PlanFanOut:
+    """Runs independent LLM calls concurrently so a Submit costs the slowest call, not the sum."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, executor=None):
+        self.timeout = timeout
+        self.executor = executor or get_executor()
+        self.futures = {}
+        self.deadlines = {}
+
+    def __contains__(self, name):
+        return name in self.futures
+
+    def submit(self, name, fn, *args, timeout=None, **kwargs):
+        self.futures[name] = self.executor.submit(fn, *args, **kwargs)
+        self.deadlines[name] = time.monotonic() + (timeout or self.timeout)
+        return self.futures[name]
+
+    def result(self, name, wait_running=False):
+        """The call's result, or its exception. Past the call's deadline a queued call is cancelled and
+        TimeoutError raised; a running one can't be stopped, so with wait_running it is waited out instead
+        (use that when the call writes to state the caller would otherwise recompute)."""
+        future = self.futures[name]
+        remaining = max(self.deadlines[name] - time.monotonic(), 0)
+        try:
+            return future.result(timeout=remaining)
+        except TimeoutError:
+            if future.cancel() or not wait_running:
+                raise TimeoutError(f"{name} did not finish within its timeout")
+            return future.result()
+
+    def gather(self):
+        """Wait for every call; returns {name: result or the exception it raised}."""
+        if self.futures:
+            wait(self.futures.values(), timeout=max(max(self.deadlines.values()) - time.monotonic(), 0))
+        results = {}
+        for name in self.futures:
+            try:
+                results[name] = self.result(name)
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def cancel(self):
+        # Calls already in flight run to completion in the pool; queued ones never start
+        for future in self.futures.values():
+            future.cancel()
@@ -0,0 +1,127 @@
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from metrics import timed
+from meal_index import MealIndex
+from ingredient_index import IngredientIndex
+from recipe_store import load_recipes, _parse_list, RECIPES_CSV, RECIPES_STORE, PLANNER_COLUMNS, \
+    NUTRITION_COLUMNS, LIST_COLUMNS, CATEGORICAL_COLUMNS
+
+INTEGER_COLUMNS = ['id', 'minutes', 'n_ingredients']
+STRING_LIST = pa.list_(pa.string())
+
+
+def _arrow_list(series):
+    # Parsed once into one columnar buffer instead of a Python list object per row
+    if isinstance(series.dtype, pd.ArrowDtype):
+        return series
+    values = pa.array([_parse_list(x) for x in series], type=STRING_LIST)
+    return pd.Series(pd.arrays.ArrowExtensionArray(values), index=series.index, name=series.name)
+
+
+def compact_recipes(df):
+    """Recipe table with lowercase categoricals, pyarrow strings, float32 nutrition, downcast integers
+    and Arrow list columns. Columns that already have those types are not copied."""
+    columns = {}
+    for col in df.columns:
+        if col.startswith('Unnamed'):
+            continue
+        series = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(str).str.lower().astype('category')
+        elif col in NUTRITION_COLUMNS:
+            series = pd.to_numeric(series, errors='coerce').astype('float32', copy=False)
+        elif col in INTEGER_COLUMNS and series.notna().all():
+            series = pd.to_numeric(series, downcast='integer')
+        elif col in LIST_COLUMNS:
+            series = _arrow_list(series)
+        elif col == 'name':
+            series = series.astype('string[pyarrow]')
+        columns[col] = series
+    # copy=False and a fresh RangeIndex instead of reset_index(), which would copy every column again
+    compact = pd.DataFrame(columns, copy=False)
+    compact.index = pd.RangeIndex(len(compact))
+    return compact
+
+
+def intern_tokens(series):
+    """CSR encoding of a list column: (vocabulary, offsets, codes) with recipe i's tokens at
+    vocabulary[codes[offsets[i]:offsets[i + 1]]]. Tokens are lowercased and stripped, so each
+    distinct ingredient string is stored once."""
+    chunked = series.array.__arrow_array__()
+    lists = chunked.combine_chunks() if isinstance(chunked, pa.ChunkedArray) else chunked
+    lists = lists.fill_null(pa.scalar([], type=lists.type))
+    values = pc.utf8_trim_whitespace(pc.utf8_lower(lists.flatten()))
+    encoded = values.dictionary_encode()
+    vocabulary = np.asarray(encoded.dictionary.to_pylist(), dtype=object)
+    codes = encoded.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+    lengths = pc.list_value_length(lists).to_numpy(zero_copy_only=False)
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    return vocabulary, offsets, codes
+
+
+class RecipeDataset:
+    """Read-only recipe table shared by every planner in the process.
+
+    Planners keep row positions into it (and copy only the handful of rows they select), so
+    memory does not grow with the number of sessions. Nothing here may be mutated after construction.
+    """
+
+    def __init__(self, df):
+        self.df = compact_recipes(df)
+        if 'ingredients' in self.df.columns:
+            self.ingredient_vocab, self.ingredient_offsets, self.ingredient_codes = intern_tokens(self.df['ingredients'])
+        else:
+            self.ingredient_vocab = np.empty(0, dtype=object)
+            self.ingredient_offsets = np.zeros(len(self.df) + 1, dtype=np.int64)
+            self.ingredient_codes = np.empty(0, dtype=np.int32)
+        self._columns = {}
+        self._index = None
+        self._ingredient_index = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def column(self, name, dtype=np.float64):
+        """Read-only NumPy copy of a numeric column, converted once and shared."""
+        key = (name, np.dtype(dtype))
+        with self._lock:
+            if key not in self._columns:
+                values = self.df[name].to_numpy(dtype=dtype)
+                values.setflags(write=False)
+                self._columns[key] = values
+            return self._columns[key]
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._index = MealIndex(self.df)
+            return self._index
+
+    @property
+    def ingredient_index(self):
+        with self._lock:
+            if self._ingredient_index is None:
+                self._ingredient_index = IngredientIndex.from_dataset(self)
+            return self._ingredient_index
+
+    def rows(self, positions):
+        return self.df.iloc[positions]
+
+    def ingredients(self, position):
+        start, end = self.ingredient_offsets[position], self.ingredient_offsets[position + 1]
+        return self.ingredient_vocab[self.ingredient_codes[start:end]].tolist()
+
+    def memory_usage(self):
+        arrays = self.ingredient_offsets.nbytes + self.ingredient_codes.nbytes
+        return int(self.df.memory_usage(deep=True).sum()) + arrays
+
+
+@timed("recipes.dataset")
+def load_recipe_dataset(store_path=RECIPES_STORE, csv_path=RECIPES_CSV, columns=PLANNER_COLUMNS):
+    return RecipeDataset(load_recipes(store_path, csv_path, columns))
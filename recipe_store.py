@@ -0,0 +1,96 @@
+import ast
+import argparse
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metrics import timed
+
+RECIPES_CSV = os.path.join("Calories", "Recipes.csv")
+RECIPES_STORE = os.path.join("Calories", "Recipes.parquet")
+
+NUTRITION_COLUMNS = ['calories', 'total_fat', 'sugar', 'sodium', 'protein', 'saturated_fat', 'carbohydrates']
+LIST_COLUMNS = ['ingredients', 'steps', 'tags']
+CATEGORICAL_COLUMNS = ['meal_type', 'diet_type']
+
+# Columns MealPlanner actually touches (selection + display)
+PLANNER_COLUMNS = ['name', 'id', 'minutes', 'meal_type', 'diet_type', 'ingredients', 'steps'] + NUTRITION_COLUMNS
+# Without these the meal index can't be built (RAW_recipes.csv has no meal_type/diet_type labels)
+REQUIRED_COLUMNS = ['name', 'id', 'meal_type', 'diet_type', 'ingredients', 'calories', 'total_fat', 'sugar', 'protein']
+
+
+def _parse_list(x):
+    try:
+        parsed = ast.literal_eval(x) if isinstance(x, str) else x
+        return [str(v) for v in parsed] if isinstance(parsed, list) else [str(parsed)]
+    except (ValueError, SyntaxError):
+        return [str(x)]
+
+
+def build_recipe_store(csv_path=RECIPES_CSV, out_path=RECIPES_STORE, row_group_size=16384):
+    # One-time conversion: parse list cells once and persist typed columns so the app never has to
+    df = pd.read_csv(csv_path)
+    df = df.drop(columns=[col for col in df.columns if col.startswith('Unnamed')])
+
+    # Food.com exports (RAW_recipes.csv) carry the packed `nutrition` list
+    if 'nutrition' in df.columns:
+        if not set(NUTRITION_COLUMNS).issubset(df.columns):
+            df[NUTRITION_COLUMNS] = pd.DataFrame(df['nutrition'].apply(_parse_list).tolist(), index=df.index).astype(float)
+        df = df.drop(columns=['nutrition'])
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"{csv_path} is missing required columns: {', '.join(missing)}. "
+                         "Use the labelled Recipes.csv (RAW_recipes.csv has no meal_type/diet_type).")
+
+    for col in LIST_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].apply(_parse_list)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.lower().astype('category')
+    for col in NUTRITION_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, out_path, row_group_size=row_group_size, compression='zstd')
+    return out_path
+
+
+def _arrow_lists(arrow_type):
+    # Keep list columns columnar; element access still yields a plain Python list
+    return pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type) else None
+
+
+def load_recipe_store(path=RECIPES_STORE, columns=PLANNER_COLUMNS):
+    available = pq.read_schema(path).names
+    if columns is not None:
+        columns = [col for col in columns if col in available]
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(types_mapper=_arrow_lists)
+
+
+@timed("recipes.load")
+def load_recipes(store_path=RECIPES_STORE, csv_path=RECIPES_CSV, columns=PLANNER_COLUMNS):
+    if os.path.exists(store_path):
+        return load_recipe_store(store_path, columns=columns)
+    # Fall back to the raw CSV until the store has been built
+    if columns is None:
+        return pd.read_csv(csv_path)
+    # Only the requested columns are parsed, as on the Parquet path
+    wanted = set(columns)
+    df = pd.read_csv(csv_path, usecols=lambda col: col in wanted)
+    return df[[col for col in columns if col in df.columns]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the recipe CSV into a columnar Parquet store.")
+    parser.add_argument("--csv", default=RECIPES_CSV,
+                        help="Recipes.csv, or any export with meal_type and diet_type (a packed nutrition column is split)")
+    parser.add_argument("--out", default=RECIPES_STORE)
+    args = parser.parse_args()
+    try:
+        print("Recipe store written to:", build_recipe_store(args.csv, args.out))
+    except ValueError as e:
+        parser.exit(1, f"error: {e}\n")
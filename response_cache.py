@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from metrics import register_cache
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "llm_responses.sqlite")
+
+
+def normalize_prompt(prompt):
+    # Whitespace-only differences (indentation of the f-string templates) must not split the cache
+    return " ".join(prompt.split())
+
+
+def doc_ids(docs):
+    ids = []
+    for doc in docs:
+        doc_id = getattr(doc, "id", None)
+        ids.append(doc_id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:16])
+    return ids
+
+
+class ResponseCache:
+    """SQLite-backed LLM response cache with TTL expiry and LRU eviction past max_entries."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=7 * 24 * 3600, max_entries=10000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, prompt, doc_ids=(), **params):
+        payload = json.dumps(
+            {"model": model, "prompt": normalize_prompt(prompt), "docs": list(doc_ids), "params": params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def get_or_call(self, key, call):
+        value = self.get(key)
+        if value is None:
+            value = call()
+            self.set(key, value)
+        return value
+
+    def cached_stream(self, key, stream):
+        # Replays a hit as a single chunk; a miss is streamed through and stored once complete
+        value = self.get(key)
+        if value is not None:
+            yield value
+            return
+        parts = []
+        for token in stream():
+            parts.append(token)
+            yield token
+        self.set(key, "".join(parts).strip())
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                path=os.getenv("RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 3600)),
+                max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000)),
+            )
+            register_cache("response", _default_cache.stats)
+    return _default_cache
@@ -0,0 +1,82 @@
+import threading
+import weakref
+import numpy as np
+
+# metadata["source"] values the GPT planners are allowed to ground answers on
+VALID_SOURCES = frozenset({"diet", "physical", "Weight", "GymDataset", "weight_gain", "weight_loss", "Human_Nut", "Nut_Science"})
+
+_lock = threading.Lock()
+# store -> {"sources": per-row source array, "bitmaps": {frozenset(sources): packed bits}}
+_store_cache = weakref.WeakKeyDictionary()
+
+
+def _store_entry(store):
+    with _lock:
+        entry = _store_cache.get(store)
+        if entry is None:
+            rows = store.index.ntotal
+            sources = np.empty(rows, dtype=object)
+            for row in range(rows):
+                doc_id = store.index_to_docstore_id.get(row)
+                doc = store.docstore.search(doc_id) if doc_id is not None else None
+                sources[row] = getattr(doc, "metadata", {}).get("source") if doc is not None else None
+            entry = {"sources": sources, "bitmaps": {}}
+            _store_cache[store] = entry
+        return entry
+
+
+def source_bitmap(store, sources):
+    """Packed little-endian bitmap over FAISS rows whose document source is in sources (built once per store)."""
+    entry = _store_entry(store)
+    key = frozenset(sources)
+    with _lock:
+        if key not in entry["bitmaps"]:
+            mask = np.isin(entry["sources"], list(key))
+            entry["bitmaps"][key] = (np.packbits(mask, bitorder="little"), int(mask.sum()))
+        return entry["bitmaps"][key]
+
+
+def _documents(store, distances, rows):
+    results = []
+    for distance, row in zip(distances, rows):
+        if row == -1:
+            continue
+        doc = store.docstore.search(store.index_to_docstore_id[int(row)])
+        results.append((doc, float(distance)))
+    return results
+
+
+def filtered_search(store, embedding, k=7, sources=VALID_SOURCES, score_threshold=None):
+    """k nearest chunks restricted to sources, filtered inside the index rather than after it.
+
+    Distances ascend (L2), so cutting the selector-restricted top k at score_threshold is
+    equivalent to a thresholded search over only the allowed rows.
+    """
+    import faiss
+
+    query = np.asarray([embedding], dtype=np.float32)
+    if getattr(store, "_normalize_L2", False):
+        faiss.normalize_L2(query)
+
+    bits, allowed = source_bitmap(store, sources)
+    if allowed == 0:
+        return []
+    try:
+        selector = faiss.IDSelectorBitmap(store.index.ntotal, faiss.swig_ptr(bits))
+        distances, rows = store.index.search(query, min(k, allowed), params=faiss.SearchParameters(sel=selector))
+        results = _documents(store, distances[0], rows[0])
+    except (RuntimeError, TypeError, AttributeError):
+        # Index type without selector support: over-fetch and refill until k valid chunks
+        results = []
+        fetch = k * 4
+        while True:
+            distances, rows = store.index.search(query, min(fetch, store.index.ntotal))
+            results = [(doc, score) for doc, score in _documents(store, distances[0], rows[0])
+                       if doc.metadata.get("source") in sources][:k]
+            if len(results) >= k or fetch >= store.index.ntotal:
+                break
+            fetch *= 2
+
+    if score_threshold is not None:
+        results = [(doc, score) for doc, score in results if score <= score_threshold]
+    return results
@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from metrics import timed, register_cache
+from weight_planner import ACTIVITY_FACTORS, simulate_batch, simulate_dynamic_batch
+from meal_planner import MealPlanner, MEAL_STRUCTURE
+from recipe_dataset import RecipeDataset
+
+# Same grid as the sidebar inputs
+WEEKLY_RATES = (0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+ACTIVITY_LEVELS = tuple(ACTIVITY_FACTORS)
+# Common lower bounds for unsupervised daily intake
+CALORIE_FLOOR = {"male": 1500, "female": 1200}
+# A day's meals within this share of the target count as a feasible plan
+MEAL_PLAN_TOLERANCE = 0.10
+DEFAULT_MAX_ENTRIES = int(os.getenv("SCENARIO_CACHE_MAX_ENTRIES", 256))
+
+
+class ScenarioSweep:
+    """Forecasts and meal plans for a grid of weekly rates x activity levels for one profile.
+
+    table has one row per scenario (in grid order); forecast(i) and meals(i) return that scenario's
+    curve and day plan. Instances are cached and shared, so treat them as read-only.
+    """
+
+    def __init__(self, table, weights, meal_plans):
+        self.table = table
+        self.weights = weights
+        self.meal_plans = meal_plans
+
+    def __len__(self):
+        return len(self.table)
+
+    def find(self, activity, weekly_loss):
+        matches = np.flatnonzero((self.table["activity"] == activity).to_numpy()
+                                 & np.isclose(self.table["weekly_loss"].to_numpy(), weekly_loss))
+        return int(matches[0]) if len(matches) else None
+
+    def forecast(self, i):
+        weeks = int(self.table["weeks"].iat[i])
+        return pd.DataFrame({"Week": np.arange(weeks + 1), "Estimated Weight (kg)": self.weights[i, :weeks + 1]})
+
+    def meals(self, i):
+        return self.meal_plans[int(self.table["target_calories"].iat[i])]
+
+
+@timed("scenario.sweep")
+def sweep_scenarios(recipes, age, gender, height_cm, present_weight, target_weight, diet="veg",
+                    weekly_rates=WEEKLY_RATES, activity_levels=ACTIVITY_LEVELS, **meal_options):
+    """Evaluates every (activity level, weekly rate) pair. Forecasts are one vectorized simulation over the
+    grid; meal plans are selected once per distinct target calories. No LLM calls are made.
+    meal_options (exclude_ingredients, include_ingredients, pantry) are passed to MealPlanner."""
+    if not isinstance(recipes, RecipeDataset):
+        recipes = RecipeDataset(recipes)
+    activity, rate = (a.ravel() for a in np.meshgrid(list(activity_levels), list(weekly_rates), indexing="ij"))
+    weights, weeks, target_cal, maintenance_cal = simulate_batch(
+        present_weight, target_weight, age, height_cm, gender, activity, rate)
+    _, _, days_to_target, _ = simulate_dynamic_batch(
+        present_weight, target_weight, age, height_cm, gender, activity, rate, step_days=7)
+
+    meal_plans = {}
+    plan_kcal = np.zeros(len(target_cal))
+    plan_slots = np.zeros(len(target_cal), dtype=int)
+    for i, calories in enumerate(target_cal.astype(int)):
+        if calories not in meal_plans:
+            planner = MealPlanner(recipes, total_calories=calories, diet_type=diet, **meal_options)
+            planner.select_meals()
+            meal_plans[calories] = planner.selected_meals_df
+        meals = meal_plans[calories]
+        plan_kcal[i] = meals["calories"].sum() if len(meals) else 0.0
+        plan_slots[i] = len(meals)
+
+    gap = (plan_kcal - target_cal) / target_cal
+    below_floor = target_cal < CALORIE_FLOOR.get(str(gender).lower(), 1200)
+    table = pd.DataFrame({
+        "activity": activity,
+        "weekly_loss": rate,
+        "weeks": weeks,
+        "adaptive_weeks": np.where(np.isfinite(days_to_target), np.ceil(days_to_target / 7), np.nan),
+        "target_calories": target_cal.astype(int),
+        "maintenance_calories": maintenance_cal.astype(int),
+        "meal_plan_calories": plan_kcal.round(),
+        "meal_plan_gap_pct": (gap * 100).round(1),
+        "below_calorie_floor": below_floor,
+        "feasible": (plan_slots == len(MEAL_STRUCTURE)) & (np.abs(gap) <= MEAL_PLAN_TOLERANCE) & ~below_floor,
+    })
+    return ScenarioSweep(table, weights, meal_plans)
+
+
+def profile_key(recipes, age, gender, height_cm, present_weight, target_weight, diet="veg",
+                weekly_rates=WEEKLY_RATES, activity_levels=ACTIVITY_LEVELS, **meal_options):
+    options = tuple(sorted((name, tuple(value) if isinstance(value, (list, tuple)) else value)
+                           for name, value in meal_options.items()))
+    # id(recipes): a reloaded recipe table must not reuse plans from the old one. ScenarioCache keeps the
+    # table referenced alongside each entry, so the id can't be recycled while the entry exists
+    return (id(recipes), int(age), str(gender).lower(), float(height_cm), float(present_weight), float(target_weight),
+            diet, tuple(float(r) for r in weekly_rates), tuple(activity_levels), options)
+
+
+class ScenarioCache:
+    """In-process LRU of ScenarioSweep results keyed by profile; sweeps are deterministic, so no TTL."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_sweep(self, recipes, **profile):
+        key = profile_key(recipes, **profile)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][1]
+            self.misses += 1
+        result = sweep_scenarios(recipes, **profile)
+        with self._lock:
+            self._entries[key] = (recipes, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_default_cache = ScenarioCache()
+register_cache("scenario", _default_cache.stats)
+
+
+def get_scenario_cache():
+    return _default_cache
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+import numpy as np
+from metrics import register_cache
+
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2000))
+
+
+def profile_bucket(age, gender, height_cm, present_weight, target_weight, calories):
+    # Coarse enough that similar users share answers, fine enough that the advice still fits them
+    goal = "gain" if target_weight > present_weight else "lose"
+    return (
+        str(gender).lower(), goal, int(age) // 10, round(height_cm / 5),
+        round(present_weight / 5), round(target_weight / 5), round(calories / 100),
+    )
+
+
+class SemanticCache:
+    """Answers to past questions, matched by cosine similarity of the question embedding per profile bucket."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # bucket -> {"vectors": (n, d) unit rows, "values": [...], "used": [...]}
+        self._buckets = {}
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, bucket):
+        query = self._normalize(embedding)
+        with self._lock:
+            entry = self._buckets.get(bucket)
+            if entry is not None and len(entry["values"]):
+                similarities = entry["vectors"] @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry["used"][best] = time.monotonic()
+                    self.hits += 1
+                    return entry["values"][best]
+            self.misses += 1
+            return None
+
+    def add(self, embedding, bucket, value):
+        vector = self._normalize(embedding)[None, :]
+        with self._lock:
+            entry = self._buckets.setdefault(bucket, {"vectors": np.empty((0, vector.shape[1]), dtype=np.float32), "values": [], "used": []})
+            entry["vectors"] = np.vstack([entry["vectors"], vector])
+            entry["values"].append(value)
+            entry["used"].append(time.monotonic())
+            self._evict()
+
+    def _evict(self):
+        # Drop the least recently used entries across all buckets once over capacity
+        excess = sum(len(entry["values"]) for entry in self._buckets.values()) - self.max_entries
+        while excess > 0:
+            bucket, position = min(
+                ((bucket, int(np.argmin(entry["used"]))) for bucket, entry in self._buckets.items() if entry["used"]),
+                key=lambda item: self._buckets[item[0]]["used"][item[1]],
+            )
+            entry = self._buckets[bucket]
+            entry["vectors"] = np.delete(entry["vectors"], position, axis=0)
+            del entry["values"][position]
+            del entry["used"][position]
+            if not entry["values"]:
+                del self._buckets[bucket]
+            excess -= 1
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = sum(len(entry["values"]) for entry in self._buckets.values())
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "buckets": len(self._buckets),
+            }
+
+
+_default_cache = SemanticCache()
+register_cache("semantic", _default_cache.stats)
+
+
+def get_semantic_cache():
+    return _default_cache
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from metrics import record_usage
+
+# faiss, openai and langchain take seconds to import; they are imported on first use below
+
+# How often (seconds) a vector directory is re-stat'ed for hot reload
+RELOAD_CHECK_SECONDS = 5
+
+# Written next to the index by build_vector_index.py; records which embedding model built it
+MANIFEST_FILE = "manifest.json"
+DEFAULT_EMBEDDINGS = "openai"
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 32))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_embeddings = {}
+_vectorstores = {}
+_chains = {}
+_openai_clients = {}
+# vector path -> lock held while that index is (re)loaded
+_path_locks = {}
+_env_loaded = False
+
+
+def load_env():
+    """Reads .env into os.environ once per process (never overriding variables that are already set)."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_openai_client(api_key=None):
+    """One keep-alive connection pool per API key, shared by every planner in the process."""
+    load_env()
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    with _lock:
+        if api_key not in _openai_clients:
+            import httpx
+            from openai import OpenAI, DefaultHttpxClient
+            limits = httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS)
+            _openai_clients[api_key] = OpenAI(api_key=api_key, http_client=DefaultHttpxClient(limits=limits))
+        return _openai_clients[api_key]
+
+
+def make_embeddings(spec=DEFAULT_EMBEDDINGS):
+    """"openai" for OpenAIEmbeddings, "local:<model name or path>" for an on-device sentence-transformers model."""
+    load_env()
+    if spec == "openai":
+        from langchain.embeddings import OpenAIEmbeddings
+        return OpenAIEmbeddings()
+    if spec.startswith("local:"):
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=spec.split(":", 1)[1])
+    raise ValueError(f"Unknown embeddings spec: {spec}")
+
+
+def get_embeddings(spec=DEFAULT_EMBEDDINGS):
+    with _lock:
+        if spec not in _embeddings:
+            _embeddings[spec] = make_embeddings(spec)
+        return _embeddings[spec]
+
+
+def embeddings_spec(vector_path):
+    manifest = os.path.join(vector_path, MANIFEST_FILE)
+    if not os.path.exists(manifest):
+        return DEFAULT_EMBEDDINGS
+    with open(manifest, encoding="utf-8") as f:
+        return json.load(f).get("embeddings", DEFAULT_EMBEDDINGS)
+
+
+def _signature(vector_path, index_name="index"):
+    files = [os.path.join(vector_path, f"{index_name}.faiss"), os.path.join(vector_path, f"{index_name}.pkl")]
+    return tuple((os.path.getmtime(f), os.path.getsize(f)) for f in files if os.path.exists(f))
+
+
+def _load_faiss(vector_path, embeddings, index_name="index"):
+    import faiss
+    from langchain.vectorstores import FAISS
+
+    index_file = os.path.join(vector_path, f"{index_name}.faiss")
+    try:
+        # Map the vectors instead of copying them onto the heap; pages are shared between processes
+        index = faiss.read_index(index_file, getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_file)
+
+    # Same trust model as FAISS.load_local(..., allow_dangerous_deserialization=True)
+    with open(os.path.join(vector_path, f"{index_name}.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def get_vectorstore(vector_path="vector"):
+    """Process-wide read-only FAISS store for vector_path, reloaded when its files change.
+
+    Loading happens under a per-path lock, not the module lock, so a reload never blocks
+    LLM clients or chains; a failed reload keeps serving the previous store."""
+    key = os.path.abspath(vector_path)
+    with _lock:
+        entry = _vectorstores.get(key)
+        if entry is not None and time.monotonic() - entry["checked"] < RELOAD_CHECK_SECONDS:
+            return entry["store"]
+        path_lock = _path_locks.setdefault(key, threading.Lock())
+
+    with path_lock:
+        with _lock:
+            # Another thread may have (re)loaded it while this one waited
+            entry = _vectorstores.get(key)
+            if entry is not None and time.monotonic() - entry["checked"] < RELOAD_CHECK_SECONDS:
+                return entry["store"]
+
+        now = time.monotonic()
+        signature = _signature(vector_path)
+        if entry is None or entry["signature"] != signature:
+            try:
+                # Queries must be embedded by the same model that built the index
+                store = _load_faiss(vector_path, get_embeddings(embeddings_spec(vector_path)))
+                entry = {"store": store, "signature": signature}
+            except (OSError, RuntimeError, EOFError, ValueError, pickle.UnpicklingError):
+                if entry is None:
+                    raise
+                # Caught mid-swap by build_vector_index, or a broken write: retry at the next check
+                logger.warning("Reloading %s failed; still serving the previous index", vector_path, exc_info=True)
+        with _lock:
+            _vectorstores[key] = dict(entry, checked=now)
+        return entry["store"]
+
+
+def usage_callback(model_name):
+    """Callback feeding token usage reported by non-streaming chain calls into the metrics counters."""
+    from langchain.callbacks.base import BaseCallbackHandler
+
+    class UsageCallback(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            usage = (response.llm_output or {}).get("token_usage")
+            if usage:
+                record_usage(model_name, usage)
+
+    return UsageCallback()
+
+
+def get_chain(model_name, temperature):
+    key = (model_name, temperature)
+    with _lock:
+        if key not in _chains:
+            load_env()
+            from langchain.chat_models import ChatOpenAI
+            from langchain.chains.qa_with_sources import load_qa_with_sources_chain
+
+            llm = ChatOpenAI(model_name=model_name, temperature=temperature, callbacks=[usage_callback(model_name)])
+            _chains[key] = (llm, load_qa_with_sources_chain(llm, chain_type="stuff"))
+        return _chains[key]
+
+
+def stream_chain(llm, chain, docs, question):
+    """Token stream for the same prompt the "stuff" QA chain would send for docs + question."""
+    inputs = chain._get_inputs(docs, question=question)
+    messages = chain.llm_chain.prompt.format_prompt(**inputs).to_messages()
+    parts = []
+    for chunk in llm.stream(messages):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    # Streamed chat responses carry no usage block; count both sides locally with tiktoken
+    try:
+        prompt_tokens = llm.get_num_tokens_from_messages(messages)
+        completion_tokens = llm.get_num_tokens("".join(parts))
+    except Exception:
+        # tiktoken could not load its encoding (e.g. offline): ~4 characters per token
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        completion_tokens = len("".join(parts)) // 4
+    record_usage(llm.model_name, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+
+
+def clear():
+    with _lock:
+        _embeddings.clear()
+        _vectorstores.clear()
+        _chains.clear()
+        _openai_clients.clear()
@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+DIET_TYPES = ["veg", "vegan"]
+INGREDIENTS = ["eggs", "milk", "almond milk", "chicken breast", "rice", "salt", "olive oil", "garlic", "onion",
+               "tomatoes", "peanut butter", "oats", "honey", "butter", "spinach", "tofu", "flour", "lemon juice"]
+
+
+def make_recipes(n=400, seed=0):
+    """Recipes.csv-shaped frame; list cells are strings, as in the real export."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(2, 7, n)
+    return pd.DataFrame({
+        "name": [f"recipe {i}" for i in range(n)],
+        "id": np.arange(n) + 1000,
+        "minutes": rng.integers(5, 120, n),
+        "steps": [str([f"step {j}" for j in range(2)]) for _ in range(n)],
+        "ingredients": [str(rng.choice(INGREDIENTS, k, replace=False).tolist()) for k in counts],
+        "n_ingredients": counts,
+        "meal_type": rng.choice(MEAL_TYPES, n),
+        "diet_type": rng.choice(DIET_TYPES, n),
+        "calories": rng.uniform(80, 1000, n).round(1),
+        "total_fat": rng.integers(0, 60, n).astype(float),
+        "sugar": rng.integers(0, 30, n).astype(float),
+        "sodium": rng.integers(0, 60, n).astype(float),
+        "protein": rng.integers(0, 60, n).astype(float),
+        "saturated_fat": rng.integers(0, 60, n).astype(float),
+        "carbohydrates": rng.integers(0, 60, n).astype(float),
+    })
+
+
+@pytest.fixture
+def recipes_df():
+    return make_recipes()
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    from recipe_dataset import RecipeDataset
+    return RecipeDataset(make_recipes())
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    """Registers a deterministic offline embeddings model under the spec "fake"."""
+    import shared_resources
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    embeddings = DeterministicFakeEmbedding(size=16)
+    monkeypatch.setattr(shared_resources, "_embeddings", {"fake": embeddings})
+    monkeypatch.setattr(shared_resources, "_vectorstores", {})
+    return embeddings
+
+
+def save_store(path, embeddings, texts, sources):
+    """FAISS store of texts tagged with metadata["source"], saved with a manifest naming the "fake" spec."""
+    import json
+    from langchain_community.vectorstores import FAISS
+    from shared_resources import MANIFEST_FILE
+    store = FAISS.from_texts(texts, embeddings, metadatas=[{"source": source} for source in sources])
+    store.save_local(str(path))
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"embeddings": "fake", "sources": {}}, f)
+    return store
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import api_server
+from api_server import ForecastBatcher, Profile
+
+PROFILE = {"age": 35, "gender": "male", "height_cm": 180, "present_weight": 90, "target_weight": 80, "weekly_loss": 1.0}
+
+
+@pytest.fixture
+def app(tmp_path, recipes_df, monkeypatch):
+    recipes_df.to_csv(tmp_path / "Recipes.csv", index=False)
+    monkeypatch.setattr(api_server, "RECIPES_STORE", str(tmp_path / "missing.parquet"))
+    monkeypatch.setattr(api_server, "RECIPES_CSV", str(tmp_path / "Recipes.csv"))
+    monkeypatch.setattr(api_server, "VECTOR_PATH", str(tmp_path / "vector"))
+    monkeypatch.setattr(api_server, "state", {})
+    return api_server.app
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    with TestClient(app) as client:
+        yield client
+
+
+def test_forecast_matches_batch(client):
+    assert client.get("/health").json() == {"status": "ok", "recipes": 400}
+    single = client.post("/forecast", json=PROFILE).json()
+    batch = client.post("/forecast/batch", json=[PROFILE, dict(PROFILE, target_weight=95)]).json()
+    assert single == batch[0]
+    assert single["weeks"] == 23 and single["forecast"][-1] == 80
+    assert batch[1]["target_calories"] > batch[1]["maintenance_calories"]
+
+
+def test_invalid_profile_is_rejected(client):
+    assert client.post("/forecast", json=dict(PROFILE, weekly_loss=0)).status_code == 422
+    assert client.post("/forecast/batch", json=[PROFILE] * (api_server.MAX_BATCH_SIZE + 1)).status_code == 422
+
+
+def test_starts_without_an_api_key(app, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    with TestClient(app) as client:
+        assert client.post("/forecast", json=PROFILE).status_code == 200
+        assert client.post("/meal-plan", json={"profile": PROFILE, "diet": "veg"}).status_code == 200
+        response = client.post("/chat", json={"profile": PROFILE, "question": "Is fruit ok?"})
+        assert response.status_code == 503 and "OPENAI_API_KEY" in response.json()["detail"]
+        assert client.post("/exercise-plan", json=PROFILE).status_code == 503
+
+
+def test_meal_plan(client):
+    response = client.post("/meal-plan", json={"profile": PROFILE, "diet": "vegan"})
+    assert response.status_code == 200
+    plan = response.json()
+    assert [meal["meal_type"] for meal in plan["meals"]] == ["breakfast", "snack", "lunch", "dinner"]
+    assert all(isinstance(meal["ingredients"], list) for meal in plan["meals"])
+    assert all(meal["calories"] == round(meal["calories"], 1) for meal in plan["meals"])
+
+    response = client.post("/meal-plan", json={"profile": PROFILE, "diet": "non_veg"})
+    assert response.status_code == 404
+
+
+def test_batcher_coalesces_concurrent_requests(monkeypatch):
+    sizes = []
+    forecast = api_server.forecast
+    monkeypatch.setattr(api_server, "forecast", lambda profiles: sizes.append(len(profiles)) or forecast(profiles))
+
+    async def run():
+        batcher = ForecastBatcher(window=0.05)
+        batcher.start()
+        profiles = [Profile(**dict(PROFILE, target_weight=60 + i)) for i in range(10)]
+        results = await asyncio.gather(*(batcher.submit(profile) for profile in profiles))
+        task = batcher.task
+        await batcher.stop()
+        return results, task
+
+    results, task = asyncio.run(run())
+    assert sizes == [10]
+    assert [r["forecast"][-1] for r in results] == [60 + i for i in range(10)]
+    assert task.cancelled()
+
+
+def test_scenarios(client):
+    request = {"profile": PROFILE, "diet": "vegan", "weekly_rates": [0.5, 1.0], "activity_levels": ["light"]}
+    scenarios = client.post("/scenarios", json=request).json()["scenarios"]
+
+    assert [(s["activity"], s["weekly_loss"]) for s in scenarios] == [("light", 0.5), ("light", 1.0)]
+    assert scenarios[1]["weeks"] == client.post("/forecast", json=dict(PROFILE, activity="light")).json()["weeks"]
+    assert all(len(s["meals"]) == 4 and isinstance(s["feasible"], bool) for s in scenarios)
+    assert client.post("/scenarios", json=dict(request, weekly_rates=[])).status_code == 422
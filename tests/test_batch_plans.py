@@ -0,0 +1,103 @@
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import batch_plans
+from batch_plans import ResultWriter, completed_ids, plan_chunk, read_profiles, run_batch, RESULT_SCHEMA
+
+PROFILES = [
+    {"user_id": "a", "age": 30, "gender": "male", "height_cm": 180, "present_weight": 90, "target_weight": 80, "diet": "veg"},
+    {"user_id": "b", "age": 45, "gender": "female", "height_cm": 160, "present_weight": 70, "target_weight": 62, "diet": "vegan"},
+    {"user_id": "c", "age": 25, "gender": "female", "height_cm": 170, "present_weight": 55, "target_weight": 60, "diet": "keto"},
+]
+
+
+@pytest.fixture
+def paths(tmp_path, recipes_df):
+    recipes_df.to_csv(tmp_path / "Recipes.csv", index=False)
+    pd.DataFrame(PROFILES).to_csv(tmp_path / "profiles.csv", index=False)
+    return {"csv": str(tmp_path / "Recipes.csv"), "store": str(tmp_path / "missing.parquet"),
+            "profiles": str(tmp_path / "profiles.csv")}
+
+
+@pytest.fixture
+def worker(paths, monkeypatch):
+    for name, value in {"_recipes": None, "_index": None, "_limiter": None, "_planners": {}}.items():
+        monkeypatch.setattr(batch_plans, name, value)
+    batch_plans._init_worker(paths["store"], paths["csv"], 0)
+
+
+def test_plan_chunk(worker, paths):
+    profiles = read_profiles(paths["profiles"])
+    results = plan_chunk(profiles + [dict(profiles[0], user_id="d", diet=None)])
+
+    assert [r["user_id"] for r in results] == ["a", "b", "c", "d"]
+    assert [len(r["meals"]) for r in results[:3]] == [4, 4, 0]
+    assert results[0]["forecast"][0] == 90 and results[0]["forecast"][-1] == 80
+    assert results[0]["weeks"] == len(results[0]["forecast"]) - 1
+    assert [r["error"] for r in results[:3]] == [None, None, None]
+    assert results[3]["error"].startswith("AttributeError") and "meals" not in results[3]
+
+
+def test_parquet_parts_share_one_schema(tmp_path, worker, paths):
+    profiles = read_profiles(paths["profiles"])
+    writer = ResultWriter(str(tmp_path / "out"))
+    writer.write(plan_chunk([dict(profiles[0], user_id="x", diet=None)]))
+    writer.write(plan_chunk(profiles))
+
+    for part in sorted((tmp_path / "out").glob("part-*.parquet")):
+        assert pq.read_schema(part).equals(RESULT_SCHEMA)
+    table = pq.read_table(tmp_path / "out")
+    assert table.column("user_id").to_pylist() == ["x", "a", "b", "c"]
+    assert completed_ids(str(tmp_path / "out")) == {"a", "b", "c"}
+
+
+def test_completed_ids_skips_errors_and_torn_lines(tmp_path):
+    out = tmp_path / "results.jsonl"
+    out.write_text(json.dumps({"user_id": "a", "error": None}) + "\n"
+                   + json.dumps({"user_id": "b", "error": "KeyError: 'x'"}) + "\n"
+                   + '{"user_id": "c", "err')
+    assert completed_ids(str(out)) == {"a"}
+    assert completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+@pytest.mark.parametrize("out_name", ["results.jsonl", "results"])
+def test_run_batch_resumes(tmp_path, paths, out_name):
+    out = str(tmp_path / out_name)
+    assert run_batch(paths["profiles"], out, workers=1, chunk_size=2, store_path=paths["store"], csv_path=paths["csv"]) == 3
+    assert completed_ids(out) == {"a", "b", "c"}
+    assert run_batch(paths["profiles"], out, workers=1, chunk_size=2, store_path=paths["store"], csv_path=paths["csv"]) == 0
+
+
+def test_blank_fields_become_error_rows(tmp_path, worker, paths):
+    profiles = pd.DataFrame(PROFILES)
+    profiles.loc[0, "target_weight"] = None
+    profiles.loc[1, "present_weight"] = None
+    profiles.loc[2, "weekly_loss"] = None
+    profiles.to_csv(paths["profiles"], index=False)
+
+    results = plan_chunk(read_profiles(paths["profiles"]))
+    assert [r["user_id"] for r in results] == ["a", "b", "c"]
+    assert results[0]["error"] == "ValueError: missing or invalid target_weight"
+    assert results[1]["error"] == "ValueError: missing or invalid present_weight"
+    assert results[1]["weeks"] is None
+    assert results[2]["error"] is None and results[2]["weeks"] > 0
+
+    ResultWriter(str(tmp_path / "out")).write(results)
+    assert completed_ids(str(tmp_path / "out")) == {"c"}
+
+
+def flaky_chunk(profiles, with_llm=False):
+    if any(p["user_id"] == "a" for p in profiles):
+        raise MemoryError("worker ran out of memory")
+    return plan_chunk(profiles, with_llm)
+
+
+def test_failed_chunk_does_not_stop_the_run(tmp_path, paths, monkeypatch):
+    monkeypatch.setattr(batch_plans, "plan_chunk", flaky_chunk)
+
+    out = str(tmp_path / "results.jsonl")
+    assert run_batch(paths["profiles"], out, workers=1, chunk_size=1, store_path=paths["store"], csv_path=paths["csv"]) == 3
+    rows = [json.loads(line) for line in open(out, encoding="utf-8")]
+    assert [r["error"] for r in rows] == ["MemoryError: worker ran out of memory", None, None]
+    assert completed_ids(out) == {"b", "c"}
@@ -0,0 +1,91 @@
+import os
+import pytest
+import build_vector_index
+from build_vector_index import build_index, read_manifest
+
+SOURCES = {"Weight": "Weight Myths.txt", "diet": "diet.txt"}
+
+
+@pytest.fixture
+def source_dir(tmp_path, fake_embeddings, monkeypatch):
+    monkeypatch.setattr(build_vector_index, "make_embeddings", lambda spec: fake_embeddings)
+    path = tmp_path / "sources"
+    path.mkdir()
+    (path / "Weight Myths.txt").write_text("Skipping breakfast does not burn fat.\n\nCarbs are not the enemy.")
+    (path / "diet.txt").write_text("Eat vegetables.")
+    return path
+
+
+def build(source_dir, vector_path, spec="fake", sources=SOURCES):
+    return build_index(str(source_dir), str(vector_path), spec, sources=sources, chunk_size=40, chunk_overlap=0, workers=1)
+
+
+def test_unchanged_files_are_skipped(source_dir, tmp_path):
+    vector_path = tmp_path / "vector"
+    first = build(source_dir, vector_path)
+    assert first["added"] == 3 and first["removed"] == 0
+    manifest = read_manifest(vector_path)
+    assert manifest["embeddings"] == "fake"
+    assert set(manifest["sources"]) == set(SOURCES)
+
+    assert build(source_dir, vector_path)["added"] == 0
+    assert read_manifest(vector_path) == manifest
+
+
+def test_changed_file_replaces_only_its_stale_chunks(source_dir, tmp_path, fake_embeddings):
+    from langchain_community.vectorstores import FAISS
+    vector_path = tmp_path / "vector"
+    build(source_dir, vector_path)
+    (source_dir / "Weight Myths.txt").write_text("Skipping breakfast does not burn fat.\n\nSleep matters too.")
+
+    result = build(source_dir, vector_path)
+    assert (result["added"], result["removed"]) == (1, 1)
+    store = FAISS.load_local(str(vector_path), fake_embeddings, allow_dangerous_deserialization=True)
+    texts = sorted(doc.page_content for doc in store.docstore._dict.values())
+    assert texts == ["Eat vegetables.", "Skipping breakfast does not burn fat.", "Sleep matters too."]
+    assert {doc.metadata["source"] for doc in store.docstore._dict.values()} == {"Weight", "diet"}
+
+
+def test_spec_change_without_sources_keeps_the_old_index(source_dir, tmp_path):
+    vector_path = tmp_path / "vector"
+    build(source_dir, vector_path)
+    manifest = read_manifest(vector_path)
+    index_mtime = os.path.getmtime(vector_path / "index.faiss")
+
+    result = build(tmp_path / "missing", vector_path, spec="local:other-model")
+    assert result["added"] == 0
+    assert read_manifest(vector_path) == manifest
+    assert os.path.getmtime(vector_path / "index.faiss") == index_mtime
+
+
+def test_removed_sources_are_deleted(source_dir, tmp_path, fake_embeddings):
+    from langchain_community.vectorstores import FAISS
+    vector_path = tmp_path / "vector"
+    build(source_dir, vector_path)
+
+    (source_dir / "diet.txt").unlink()
+    result = build(source_dir, vector_path, sources={"Weight": "Weight Myths.txt", "diet": "diet.txt"})
+    assert (result["added"], result["removed"]) == (0, 1)
+    assert set(read_manifest(vector_path)["sources"]) == {"Weight"}
+
+    result = build(source_dir, vector_path, sources={"diet": "diet.txt"})
+    assert result["removed"] == 2
+    assert read_manifest(vector_path)["sources"] == {}
+    store = FAISS.load_local(str(vector_path), fake_embeddings, allow_dangerous_deserialization=True)
+    assert store.index.ntotal == 0 and not store.docstore._dict
+
+
+def test_index_is_swapped_in_whole(source_dir, tmp_path, monkeypatch):
+    vector_path = tmp_path / "vector"
+    build(source_dir, vector_path)
+    (source_dir / "diet.txt").write_text("Eat more vegetables.")
+
+    def crash(self, path):
+        raise OSError("disk full")
+    from langchain_community.vectorstores import FAISS
+    before = {name: (vector_path / name).read_bytes() for name in ("index.faiss", "index.pkl", "manifest.json")}
+    monkeypatch.setattr(FAISS, "save_local", crash)
+    with pytest.raises(OSError):
+        build(source_dir, vector_path)
+    assert {name: (vector_path / name).read_bytes() for name in before} == before
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("vector")) == ["vector"]
@@ -0,0 +1,60 @@
+from langchain_core.documents import Document
+from context_packer import count_tokens, pack_context, rerank
+from metrics import get_metrics
+
+WORDS = "protein fibre sleep hydration walking strength calories balance vegetables portion".split()
+
+
+def doc(text, source="diet"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def text(seed, words=120):
+    return " ".join(f"{WORDS[(seed + i * 7) % len(WORDS)]}{(seed * 31 + i) % 97}" for i in range(words)) + "."
+
+
+def test_near_duplicates_are_dropped():
+    original = text(1)
+    results = [(doc(original), 0.2), (doc(original.replace("protein", "Protein", 1) + " extra"), 0.3), (doc(text(2)), 0.4)]
+    packed, report = pack_context(results, "anything", budget=10000)
+
+    assert [d.page_content for d, _ in packed] == [original, text(2)]
+    assert (report["docs_in"], report["docs_out"], report["duplicates"]) == (3, 2, 1)
+
+
+def test_splitter_overlap_is_stripped_per_source():
+    first, second = text(3, 60), text(4, 60)
+    overlap = first[-120:]
+    results = [(doc(first), 0.1), (doc(overlap + " " + second), 0.2), (doc(overlap + " " + text(5, 60), "physical"), 0.3)]
+    packed, _ = pack_context(results, "anything", budget=10000)
+
+    assert packed[1][0].page_content == " " + second
+    assert packed[1][0].metadata["truncated"]
+    assert packed[2][0].page_content == overlap + " " + text(5, 60)
+
+
+def test_budget_is_respected_and_last_chunk_trimmed():
+    results = [(doc(text(i, 200)), 0.1 * i) for i in range(6)]
+    chunk_tokens = count_tokens(results[0][0].page_content)
+    budget = 2 * chunk_tokens + 100
+    sent_before = get_metrics().snapshot()["counters"].get("context_tokens_sent", 0)
+
+    packed, report = pack_context(results, "anything", budget=budget)
+    assert len(packed) == 3 and report["trimmed"] == 1
+    assert packed[2][0].metadata["truncated"]
+    assert report["tokens_out"] == sum(count_tokens(d.page_content) for d, _ in packed) <= budget
+    assert report["tokens_saved"] == report["tokens_in"] - report["tokens_out"]
+    assert get_metrics().snapshot()["counters"]["context_tokens_sent"] == sent_before + report["tokens_out"]
+
+
+def test_small_remainder_is_not_sent():
+    results = [(doc(text(i, 200)), 0.1 * i) for i in range(3)]
+    packed, report = pack_context(results, "anything", budget=count_tokens(results[0][0].page_content) + 10)
+    assert len(packed) == 1 and report["trimmed"] == 0
+
+
+def test_rerank_blends_question_terms():
+    near = doc("General advice about a healthy lifestyle and routine.")
+    relevant = doc("How much protein per day: protein needs for strength training.")
+    assert rerank([(near, 0.50), (relevant, 0.55)], "how much protein for strength training")[0][0] is relevant
+    assert rerank([(near, 0.10), (relevant, 0.90)], "how much protein for strength training")[0][0] is near
@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("langchain", "langchain_community", "openai", "faiss", "streamlit", "dotenv")
+
+
+@pytest.mark.parametrize("module", ["meal_planner", "weight_planner", "GPTCustomPrompt", "gpt_weight_nutrition_planner",
+                                    "retrieval", "shared_resources"])
+def test_import_is_light(module, tmp_path):
+    # A fresh interpreter, since this test session has already imported most of these
+    code = f"import sys, os, {module}; print(sorted(m for m in {HEAVY!r} if m in sys.modules)); " \
+           f"print('OPENAI_API_KEY' in os.environ)"
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    (tmp_path / ".env").write_text("OPENAI_API_KEY=sk-from-dotenv\n")
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=dict(env, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True).stdout.split("\n")
+    assert output[:2] == ["[]", "False"]
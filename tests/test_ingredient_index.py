@@ -0,0 +1,99 @@
+import re
+import numpy as np
+import pytest
+from ingredient_index import ALLERGEN_GROUPS, PANTRY_STAPLES, split_terms
+from meal_planner import MealPlanner, MEAL_STRUCTURE
+
+
+def uses(dataset, term):
+    pattern = re.compile(rf"(^|[^a-z]){re.escape(term)}(s|es)?([^a-z]|$)")
+    return np.array([any(pattern.search(i) for i in dataset.ingredients(row)) for row in range(len(dataset))])
+
+
+def test_split_terms():
+    assert split_terms("Peanuts, milk;  Soy\n\n") == ["peanuts", "milk", "soy"]
+    assert split_terms(["  Olive   Oil "]) == ["olive oil"]
+    assert split_terms(None) == []
+
+
+@pytest.mark.parametrize("term", ["egg", "milk", "oil", "tomato", "nut", "peanut butter", "rice", "beef"])
+def test_mask_matches_whole_words(dataset, term):
+    index = dataset.ingredient_index
+    assert (index.mask([term]) == uses(dataset, term)).all()
+
+
+def test_tokens_match_whole_words_and_plurals(dataset):
+    index = dataset.ingredient_index
+    assert set(index.vocabulary[index.tokens("egg")]) == {"eggs"}
+    assert set(index.vocabulary[index.tokens("milk")]) == {"milk", "almond milk"}
+    assert set(index.vocabulary[index.tokens("tomato")]) == {"tomatoes"}
+    assert len(index.tokens("nut")) == 0
+    assert len(index.tokens("rice")) == 1
+
+
+def test_allergen_groups_expand(dataset):
+    index = dataset.ingredient_index
+    nuts = np.logical_or.reduce([uses(dataset, term) for term in ALLERGEN_GROUPS["nuts"]])
+    assert nuts.any()
+    assert (index.mask("nuts") == nuts).all()
+    assert set(index.vocabulary[index.token_codes(["dairy"])]) == {"milk", "almond milk", "butter", "peanut butter"}
+
+
+def test_query(dataset):
+    index = dataset.ingredient_index
+    assert index.query() is None
+    assert index.query(include=[], exclude="") is None
+
+    allowed = index.query(include="tofu, oats", exclude="dairy", include_all=["garlic", "onion"])
+    expected = ((uses(dataset, "tofu") | uses(dataset, "oats")) & uses(dataset, "garlic") & uses(dataset, "onion")
+                & ~index.mask("dairy"))
+    assert (allowed == expected).all()
+
+
+def test_coverage(dataset):
+    index = dataset.ingredient_index
+    positions = np.arange(0, len(dataset), 7)
+    coverage = index.coverage(positions, "eggs, spinach")
+    for position, share in zip(positions, coverage):
+        ingredients = dataset.ingredients(position)
+        available = [i for i in ingredients if i in ("eggs", "spinach") or i in PANTRY_STAPLES]
+        assert share == pytest.approx(len(available) / len(ingredients))
+    assert index.coverage([], "eggs").shape == (0,)
+
+
+def test_allowed_mask_restricts_meal_index(dataset):
+    allowed = ~dataset.ingredient_index.mask("dairy")
+    calories, positions = dataset.index.candidates("dinner", "veg", allowed)
+    assert allowed[positions].all() and np.all(np.diff(calories) >= 0)
+    assert dataset.index.candidates("dinner", "veg", np.zeros(len(dataset), dtype=bool)) is None
+    assert allowed[dataset.index.nearest("lunch", "veg", 600, 10, allowed)].all()
+    assert allowed[dataset.index.closest("lunch", "veg", 600, allowed)]
+
+
+def test_planner_ingredient_options(dataset):
+    planner = MealPlanner(dataset, total_calories=2000, diet_type="vegan", exclude_ingredients="dairy, egg")
+    planner.select_meals()
+    planner.select_week()
+    banned = dataset.ingredient_index.mask("dairy, egg")
+    for meals in (planner.selected_meals_df, planner.week_plan_df):
+        assert len(meals) and not any(banned[dataset.df["id"].searchsorted(meals["id"])])
+        assert not any(set(meal) & {"milk", "butter", "eggs"} for meal in meals["ingredients"])
+    assert "Avoid these ingredients: dairy, egg." in planner.prompt
+
+
+def test_pantry_prefers_covered_recipes(dataset):
+    plain = MealPlanner(dataset, total_calories=2000, diet_type="veg")
+    pantry = MealPlanner(dataset, total_calories=2000, diet_type="veg", pantry="tofu, rice, garlic, onion, spinach")
+    plain.select_meals()
+    pantry.select_meals()
+
+    index = dataset.ingredient_index
+    position = dataset.df["id"].searchsorted
+    plain_coverage = index.coverage(position(plain.selected_meals_df["id"]), pantry.pantry)
+    pantry_coverage = index.coverage(position(pantry.selected_meals_df["id"]), pantry.pantry)
+    assert len(pantry.selected_meals_df) == len(MEAL_STRUCTURE)
+    assert (pantry_coverage >= plain_coverage).all() and pantry_coverage.sum() > plain_coverage.sum()
+    targets = np.array(list(MEAL_STRUCTURE.values())) * 2000
+    # Outside the calorie tolerance the calorie-nearest recipe is kept
+    outside = np.abs(pantry.selected_meals_df["calories"] - targets) > 0.15 * targets
+    assert (pantry.selected_meals_df["id"][outside] == plain.selected_meals_df["id"][outside]).all()
@@ -0,0 +1,98 @@
+import json
+import pytest
+import meal_annotations
+from meal_annotations import annotate_meals, annotation_request, format_annotation, parse_annotations
+from meal_planner import MealPlanner
+from metrics import get_metrics
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(meal_annotations, "get_response_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Answers every request with a valid annotation per recipe id and records the requests."""
+    requests = []
+
+    def answer(request, api_key):
+        requests.append(request)
+        lines = request["messages"][1]["content"].splitlines()[1:]
+        ids = [int(line.split(" | ")[0][len("id="):]) for line in lines]
+        return json.dumps({"meals": [{"id": i, "name": f"Dish {i}", "tip": "Add greens.", "calorie_warning": None}
+                                     for i in ids]})
+    monkeypatch.setattr(meal_annotations, "_request", answer)
+    return requests
+
+
+def test_parse_drops_malformed_entries():
+    text = json.dumps({"meals": [
+        {"id": 1, "name": "  Sunny   Oats ", "tip": "Add berries.", "calorie_warning": "null"},
+        {"id": "2", "name": "Tofu Bowl", "tip": "Less soy sauce.", "calorie_warning": "Peanut sauce"},
+        {"id": 1, "name": "Duplicate", "tip": "Ignored."},
+        {"id": 3, "name": "", "tip": "No name."},
+        {"id": 99, "name": "Unknown", "tip": "Not requested."},
+        {"id": "x", "name": "Bad id", "tip": "Dropped."},
+        "not an object",
+    ]})
+    annotations = parse_annotations(text, [1, 2, 3])
+    assert annotations == {
+        1: {"name": "Sunny Oats", "tip": "Add berries.", "calorie_warning": None, "source": "llm"},
+        2: {"name": "Tofu Bowl", "tip": "Less soy sauce.", "calorie_warning": "Peanut sauce", "source": "llm"},
+    }
+    assert parse_annotations("not json", [1]) == {}
+    assert parse_annotations(json.dumps({"meals": {"id": 1}}), [1]) == {}
+    assert format_annotation(annotations[2]) == "Tofu Bowl — Less soy sauce. ⚠️ Peanut sauce"
+
+
+def test_meals_are_batched_and_cached(dataset, cache, model):
+    meals = [row for _, row in dataset.df.iloc[:10].iterrows()]
+    sent = []
+    annotations = annotate_meals(meals + meals[:3], batch_size=4, sent=sent)
+
+    assert sorted(annotations) == sorted(int(meal["id"]) for meal in meals)
+    assert {a["source"] for a in annotations.values()} == {"llm"}
+    assert sent == model and len(model) == 3
+    assert model[0] == annotation_request(meals[:4])
+
+    again = annotate_meals(meals[:5], sent=sent)
+    assert len(model) == 3
+    assert {a["source"] for a in again.values()} == {"cache"}
+    assert again[int(meals[0]["id"])]["name"] == f"Dish {int(meals[0]['id'])}"
+
+
+def test_failed_request_falls_back_without_caching(dataset, cache, monkeypatch):
+    def fail(request, api_key):
+        raise ConnectionError("offline")
+    monkeypatch.setattr(meal_annotations, "_request", fail)
+    failures = get_metrics().snapshot()["counters"].get("meal_annotation_failures", 0)
+    meals = [row for _, row in dataset.df.iloc[:2].iterrows()]
+
+    annotations = annotate_meals(meals)
+    assert {a["source"] for a in annotations.values()} == {"fallback"}
+    assert get_metrics().snapshot()["counters"]["meal_annotation_failures"] == failures + 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_planner_annotations(dataset, cache, model):
+    planner = MealPlanner(dataset, total_calories=2000, diet_type="veg")
+    planner.select_meals()
+    planner.generate_gpt_annotations()
+    assert planner.selected_meals_df["gpt_name"].tolist() == [f"Dish {i}" for i in planner.selected_meals_df["id"]]
+    assert planner.annotation_requests == model
+
+    planner.generate_gpt_annotations()
+    assert planner.annotation_requests == []
+
+
+def test_empty_selection_is_not_annotated(dataset, cache, model):
+    planner = MealPlanner(dataset, diet_type="keto")
+    planner.select_meals()
+    planner.generate_gpt_annotations()
+    assert list(planner.generate_stream()) == []
+    assert planner.annotate_week().empty
+    assert model == []
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from meal_index import MealIndex
+from conftest import make_recipes
+
+
+@pytest.fixture(scope="module")
+def recipes():
+    return make_recipes(600, seed=1)
+
+
+def brute_force(df, meal_type, diet_type, target_kcal):
+    """The original per-plan scan: closest calories, then least fat, then most protein."""
+    rows = df[(df["meal_type"] == meal_type) & (df["diet_type"] == diet_type) & (df["sugar"] <= 20)]
+    rows = rows.assign(diff=(rows["calories"] - target_kcal).abs(), neg_protein=-rows["protein"])
+    return rows.sort_values(["diff", "total_fat", "neg_protein"], kind="stable")
+
+
+def test_groups_exclude_sugary_recipes(recipes):
+    index = MealIndex(recipes)
+    calories, positions = index.candidates("Lunch", "VEG")
+    assert np.all(np.diff(calories) >= 0)
+    assert set(positions) == set(np.flatnonzero(((recipes["meal_type"] == "lunch") & (recipes["diet_type"] == "veg")
+                                                 & (recipes["sugar"] <= 20)).to_numpy()))
+    assert index.candidates("brunch", "veg") is None
+
+
+@pytest.mark.parametrize("target_kcal", [50.0, 233.3, 512.77, 999.9, 5000.0])
+def test_closest_matches_scan(recipes, target_kcal):
+    index = MealIndex(recipes)
+    for meal_type in ["breakfast", "lunch", "dinner", "snack"]:
+        expected = brute_force(recipes, meal_type, "vegan", target_kcal).index[0]
+        assert index.closest(meal_type, "vegan", target_kcal) == expected
+
+
+def test_closest_prefers_less_fat_then_more_protein(recipes_df):
+    df = recipes_df.iloc[:3].copy()
+    df["meal_type"], df["diet_type"], df["sugar"] = "dinner", "veg", 0.0
+    df["calories"] = [500.0, 500.0, 500.0]
+    df["total_fat"] = [20.0, 10.0, 10.0]
+    df["protein"] = [50.0, 5.0, 30.0]
+    assert MealIndex(df).closest("dinner", "veg", 480) == 2
+
+
+def test_nearest_is_ordered_by_distance(recipes):
+    index = MealIndex(recipes)
+    positions = index.nearest("dinner", "veg", 400, 10)
+    expected = brute_force(recipes, "dinner", "veg", 400)
+    assert len(positions) == 10
+    assert np.allclose(np.sort(np.abs(recipes["calories"].to_numpy()[positions] - 400)), expected["diff"].iloc[:10])
+    assert positions[0] == index.closest("dinner", "veg", 400)
+    assert len(index.nearest("brunch", "veg", 400, 10)) == 0
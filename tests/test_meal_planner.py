@@ -0,0 +1,50 @@
+import numpy as np
+from meal_planner import MealPlanner, MEAL_STRUCTURE
+from conftest import make_recipes
+
+
+def test_week_uses_distinct_recipes(dataset):
+    planner = MealPlanner(dataset, total_calories=2000, diet_type="veg")
+    week = planner.select_week()
+
+    assert len(week) == 7 * len(MEAL_STRUCTURE)
+    assert week["day"].tolist() == np.repeat(np.arange(1, 8), len(MEAL_STRUCTURE)).tolist()
+    assert week["slot"].tolist()[:len(MEAL_STRUCTURE)] == list(MEAL_STRUCTURE)
+    assert week["id"].is_unique
+    assert (week["meal_type"] == week["slot"]).all()
+    assert planner.week_warnings == []
+    daily = planner.week_summary()["calories"]
+    assert (abs(daily - 2000) / 2000 < 0.25).all()
+
+
+def test_short_week_is_filled_and_warned():
+    df = make_recipes(200, seed=2)
+    df["sugar"] = 0.0
+    breakfasts = np.flatnonzero((df["meal_type"] == "breakfast") & (df["diet_type"] == "veg"))
+    df = df.drop(index=breakfasts[3:]).reset_index(drop=True)
+
+    planner = MealPlanner(df, total_calories=2000, diet_type="veg")
+    week = planner.select_week()
+
+    assert week["day"].nunique() == 7
+    assert len(week) == 7 * len(MEAL_STRUCTURE)
+    assert week.loc[week["slot"] == "breakfast", "id"].nunique() == 3
+    assert any("Only 3 day(s)" in warning for warning in planner.week_warnings)
+
+
+def test_missing_slot_is_warned():
+    df = make_recipes(200, seed=3)
+    df = df[df["meal_type"] != "snack"].reset_index(drop=True)
+
+    planner = MealPlanner(df, total_calories=1800, diet_type="vegan")
+    week = planner.select_week()
+
+    assert set(week["slot"]) == {"breakfast", "lunch", "dinner"}
+    assert len(week) == 21
+    assert planner.week_warnings == ["No snack recipes match this diet and these ingredient options."]
+
+
+def test_no_candidates_gives_empty_week(dataset):
+    planner = MealPlanner(dataset, diet_type="keto")
+    assert planner.select_week().empty
+    assert len(planner.week_warnings) == len(MEAL_STRUCTURE)
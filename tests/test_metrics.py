@@ -0,0 +1,83 @@
+import pytest
+from metrics import Metrics, get_metrics, model_price, record_usage, timed
+
+
+@pytest.fixture
+def metrics():
+    get_metrics().reset()
+    yield get_metrics()
+    get_metrics().reset()
+
+
+def test_span_counts_errors_and_nesting():
+    m = Metrics()
+    with m.span("outer"):
+        with m.span("inner"):
+            pass
+    with pytest.raises(ValueError):
+        with m.span("outer"):
+            raise ValueError
+
+    stages = m.snapshot()["stages"]
+    assert (stages["outer"]["count"], stages["outer"]["errors"]) == (2, 1)
+    assert (stages["inner"]["count"], stages["inner"]["errors"]) == (1, 0)
+    assert [(span["stage"], span["depth"]) for span in m.snapshot()["recent"]] == [("inner", 1), ("outer", 0), ("outer", 0)]
+
+
+def test_timed_generator_closed_early_is_not_an_error(metrics):
+    @timed("stream")
+    def stream():
+        yield from ["a", "b", "c"]
+
+    tokens = stream()
+    assert next(tokens) == "a"
+    tokens.close()
+
+    stages = metrics.snapshot()["stages"]
+    assert (stages["stream"]["count"], stages["stream"]["errors"]) == (1, 0)
+    assert stages["stream.first_token"]["count"] == 1
+
+
+def test_timed_function_records_failures(metrics):
+    @timed("plan")
+    def plan(fail):
+        if fail:
+            raise RuntimeError
+        return "ok"
+
+    assert plan(False) == "ok"
+    with pytest.raises(RuntimeError):
+        plan(True)
+    assert metrics.snapshot()["stages"]["plan"]["errors"] == 1
+
+
+def test_usage_and_cost(metrics):
+    assert model_price("gpt-4o-mini-2024-07-18") == model_price("gpt-4o-mini")
+    record_usage("gpt-4-turbo-2024-04-09", {"prompt_tokens": 1000, "completion_tokens": 500})
+    record_usage("local-model", {"prompt_tokens": 10, "completion_tokens": None})
+    record_usage("gpt-4-turbo", None)
+
+    usage = metrics.snapshot()["llm"]
+    assert usage["gpt-4-turbo-2024-04-09"]["cost_usd"] == pytest.approx(0.01 + 0.015)
+    assert usage["local-model"] == {"calls": 1, "prompt_tokens": 10, "completion_tokens": 0, "cost_usd": 0.0}
+    assert "gpt-4-turbo" not in usage
+
+
+def test_prometheus_text():
+    m = Metrics()
+    m.observe("meal.select_meals", 0.003)
+    m.register_cache("response", lambda: {"hits": 3, "misses": 1, "hit_ratio": 0.75})
+
+    text = m.prometheus_text()
+    assert 'planner_stage_seconds_bucket{stage="meal.select_meals",le="0.001"} 0' in text
+    assert 'planner_stage_seconds_bucket{stage="meal.select_meals",le="0.005"} 1' in text
+    assert 'planner_stage_seconds_count{stage="meal.select_meals"} 1' in text
+    assert 'cache_hit_ratio{cache="response"} 0.75' in text
+
+
+def test_counters():
+    m = Metrics()
+    m.increment("context_tokens_sent", 120)
+    m.increment("context_tokens_sent", 30)
+    assert m.snapshot()["counters"] == {"context_tokens_sent": 150}
+    assert "planner_context_tokens_sent_total 150.0" in m.prometheus_text()
@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from plan_orchestrator import PlanFanOut
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        yield pool
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        yield pool
+
+
+def test_calls_run_concurrently(pool):
+    fan_out = PlanFanOut(timeout=5, executor=pool)
+    started = time.perf_counter()
+    for name in ["summary", "plan", "annotations"]:
+        fan_out.submit(name, time.sleep, 0.2)
+    assert fan_out.gather() == {"summary": None, "plan": None, "annotations": None}
+    assert time.perf_counter() - started < 0.5
+
+
+def test_gather_returns_exceptions(pool):
+    fan_out = PlanFanOut(timeout=5, executor=pool)
+    fan_out.submit("ok", lambda: 1)
+    fan_out.submit("failed", lambda: 1 / 0)
+    results = fan_out.gather()
+    assert results["ok"] == 1
+    assert isinstance(results["failed"], ZeroDivisionError)
+    assert "ok" in fan_out and "other" not in fan_out
+
+
+def test_running_call_times_out_or_is_waited_out(executor):
+    release = threading.Event()
+    fan_out = PlanFanOut(timeout=0.05, executor=executor)
+    fan_out.submit("annotations", lambda: release.wait(5) and "done")
+    time.sleep(0.01)
+    with pytest.raises(TimeoutError):
+        fan_out.result("annotations")
+
+    threading.Timer(0.1, release.set).start()
+    assert fan_out.result("annotations", wait_running=True) == "done"
+
+
+def test_queued_call_is_cancelled_at_its_deadline(executor):
+    release = threading.Event()
+    fan_out = PlanFanOut(timeout=5, executor=executor)
+    fan_out.submit("blocker", release.wait, 5)
+    queued = fan_out.submit("queued", lambda: "never", timeout=0.05)
+    with pytest.raises(TimeoutError):
+        fan_out.result("queued", wait_running=True)
+    assert queued.cancelled()
+    release.set()
@@ -0,0 +1,68 @@
+import ast
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from meal_planner import MealPlanner
+from recipe_dataset import RecipeDataset, compact_recipes, intern_tokens
+
+
+def test_compact_types(recipes_df):
+    df = compact_recipes(recipes_df.assign(**{"Unnamed: 0": 0, "meal_type": recipes_df["meal_type"].str.title()}))
+    assert "Unnamed: 0" not in df.columns
+    assert isinstance(df["meal_type"].dtype, pd.CategoricalDtype)
+    assert set(df["meal_type"]) == {"breakfast", "lunch", "dinner", "snack"}
+    assert df["calories"].dtype == np.float32
+    assert df["id"].dtype.itemsize < 8
+    assert isinstance(df["ingredients"].dtype, pd.ArrowDtype)
+    assert list(df["ingredients"].iloc[3]) == ast.literal_eval(recipes_df["ingredients"].iloc[3])
+
+
+def test_compact_frames_are_not_copied(recipes_df):
+    once = compact_recipes(recipes_df)
+    twice = compact_recipes(once)
+    assert np.shares_memory(once["calories"].to_numpy(), twice["calories"].to_numpy())
+    assert twice["ingredients"].array is once["ingredients"].array
+
+
+def test_interned_ingredients_round_trip(recipes_df):
+    recipes_df.loc[0, "ingredients"] = str([" Olive Oil", "salt ", "GARLIC"])
+    dataset = RecipeDataset(recipes_df)
+    assert dataset.ingredients(0) == ["olive oil", "salt", "garlic"]
+    for i in range(1, len(dataset)):
+        assert dataset.ingredients(i) == ast.literal_eval(recipes_df["ingredients"].iloc[i])
+    assert len(dataset.ingredient_vocab) == len(set(dataset.ingredient_vocab))
+    assert dataset.ingredient_offsets[-1] == len(dataset.ingredient_codes)
+
+
+def test_intern_tokens_with_missing_lists():
+    series = pd.Series(pd.arrays.ArrowExtensionArray(pa.array([["a", "b"], None, [" B"]], type=pa.list_(pa.string()))))
+    vocabulary, offsets, codes = intern_tokens(series)
+    assert offsets.tolist() == [0, 2, 2, 3]
+    assert vocabulary[codes].tolist() == ["a", "b", "b"]
+
+
+def test_planners_share_the_dataset(dataset):
+    before = dataset.df.copy()
+    planners = [MealPlanner(dataset, total_calories=calories, diet_type="veg") for calories in (1500, 2200)]
+    for planner in planners:
+        planner.select_meals()
+        planner.select_week()
+
+    assert all(planner.df is dataset.df for planner in planners)
+    assert planners[0].index is planners[1].index is dataset.index
+    pd.testing.assert_frame_equal(dataset.df, before)
+
+
+def test_columns_are_cached_and_read_only(dataset):
+    calories = dataset.column("calories")
+    assert dataset.column("calories") is calories
+    assert calories.dtype == np.float64
+    with pytest.raises(ValueError):
+        calories[0] = 0
+
+
+def test_dataset_without_ingredients(recipes_df):
+    dataset = RecipeDataset(recipes_df.drop(columns=["ingredients"]))
+    assert dataset.ingredients(5) == []
+    assert not dataset.ingredient_index.mask(["salt"]).any()
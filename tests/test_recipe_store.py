@@ -0,0 +1,49 @@
+import ast
+import pandas as pd
+import pytest
+from recipe_store import build_recipe_store, load_recipes, NUTRITION_COLUMNS, PLANNER_COLUMNS
+
+
+@pytest.fixture
+def recipes_csv(tmp_path, recipes_df):
+    path = tmp_path / "Recipes.csv"
+    recipes_df.assign(meal_type=recipes_df["meal_type"].str.upper()).to_csv(path)
+    return path
+
+
+def test_store_round_trip(tmp_path, recipes_csv, recipes_df):
+    store = build_recipe_store(recipes_csv, tmp_path / "Recipes.parquet")
+    df = load_recipes(store, recipes_csv)
+
+    assert list(df.columns) == [col for col in PLANNER_COLUMNS if col in recipes_df.columns]
+    assert not any(col.startswith("Unnamed") for col in df.columns)
+    assert isinstance(df["meal_type"].dtype, pd.CategoricalDtype)
+    assert set(df["meal_type"]) == set(recipes_df["meal_type"])
+    assert all(df[col].dtype == "float32" for col in NUTRITION_COLUMNS)
+    first = df["ingredients"].iloc[0]
+    assert list(first) == ast.literal_eval(recipes_df["ingredients"].iloc[0])
+
+
+def test_missing_labels_are_rejected(tmp_path, recipes_df):
+    recipes_df.drop(columns=["meal_type", "diet_type"]).to_csv(tmp_path / "RAW_recipes.csv", index=False)
+    with pytest.raises(ValueError, match="meal_type, diet_type"):
+        build_recipe_store(tmp_path / "RAW_recipes.csv", tmp_path / "Recipes.parquet")
+    assert not (tmp_path / "Recipes.parquet").exists()
+
+
+def test_raw_nutrition_is_split(tmp_path, recipes_df):
+    raw = recipes_df.drop(columns=NUTRITION_COLUMNS)
+    raw["nutrition"] = [str(row) for row in recipes_df[NUTRITION_COLUMNS].values.tolist()]
+    raw.to_csv(tmp_path / "RAW_recipes.csv", index=False)
+
+    store = build_recipe_store(tmp_path / "RAW_recipes.csv", tmp_path / "Recipes.parquet")
+    df = load_recipes(store, columns=None)
+
+    assert "nutrition" not in df.columns
+    assert df["calories"].tolist() == pytest.approx(recipes_df["calories"].tolist(), rel=1e-6)
+
+
+def test_falls_back_to_csv_without_store(tmp_path, recipes_csv):
+    df = load_recipes(tmp_path / "missing.parquet", recipes_csv, columns=["calories", "name", "nope"])
+    assert list(df.columns) == ["calories", "name"]
+    assert len(load_recipes(tmp_path / "missing.parquet", recipes_csv, columns=None).columns) > 10
@@ -0,0 +1,60 @@
+import pytest
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(str(tmp_path / "responses.sqlite"), ttl_seconds=60, max_entries=3)
+
+
+def test_key_ignores_whitespace_but_not_params():
+    key = ResponseCache.make_key("gpt-4", "plan  for\n  me", ["a"], max_tokens=100)
+    assert key == ResponseCache.make_key("gpt-4", "plan for me", ["a"], max_tokens=100)
+    assert key != ResponseCache.make_key("gpt-4", "plan for me", ["b"], max_tokens=100)
+    assert key != ResponseCache.make_key("gpt-4", "plan for me", ["a"], max_tokens=200)
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.set("k", {"answer": 42})
+    clock[0] += 59
+    assert cache.get("k") == {"answer": 42}
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "entries": 0}
+
+
+def test_least_recently_used_is_evicted(cache, clock):
+    for key in ["a", "b", "c"]:
+        cache.set(key, key)
+        clock[0] += 1
+    cache.get("a")
+    clock[0] += 1
+    cache.set("d", "d")
+    assert [cache.get(key) for key in ["a", "b", "c", "d"]] == ["a", None, "c", "d"]
+
+
+def test_get_or_call_calls_once(cache):
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_call("k", lambda: calls.append(1) or "value") == "value"
+    assert len(calls) == 1
+
+
+def test_cached_stream_stores_the_joined_stream(cache):
+    assert list(cache.cached_stream("k", lambda: iter(["Hello", ", ", "world "]))) == ["Hello", ", ", "world "]
+    assert list(cache.cached_stream("k", lambda: pytest.fail("stream called on a hit"))) == ["Hello, world"]
+
+
+def test_unfinished_stream_is_not_stored(cache):
+    stream = cache.cached_stream("k", lambda: iter(["partial", " answer"]))
+    next(stream)
+    stream.close()
+    assert cache.get("k") is None
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from retrieval import filtered_search, source_bitmap
+from conftest import save_store
+
+SOURCES = ["diet", "blog", "physical", "blog", "Weight", "blog", "diet", "forum", "GymDataset", "blog"] * 3
+
+
+@pytest.fixture
+def store(tmp_path, fake_embeddings):
+    texts = [f"chunk {i} about {source}" for i, source in enumerate(SOURCES)]
+    return save_store(tmp_path, fake_embeddings, texts, SOURCES)
+
+
+def brute_force(store, embedding, k, sources):
+    vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    distances = ((vectors - np.asarray(embedding, dtype=np.float32)) ** 2).sum(axis=1)
+    rows = [row for row in np.argsort(distances) if SOURCES[row] in sources][:k]
+    return [store.index_to_docstore_id[int(row)] for row in rows], distances[rows]
+
+
+@pytest.mark.parametrize("sources", [{"diet", "physical", "Weight", "GymDataset"}, {"blog"}, {"forum"}])
+def test_matches_search_over_allowed_rows(store, fake_embeddings, sources):
+    embedding = fake_embeddings.embed_query("how much protein")
+    results = filtered_search(store, embedding, k=7, sources=sources)
+    expected_ids, expected_distances = brute_force(store, embedding, 7, sources)
+
+    assert [doc.id for doc, _ in results] == expected_ids
+    assert [score for _, score in results] == pytest.approx(expected_distances, rel=1e-4)
+    assert {doc.metadata["source"] for doc, _ in results} <= sources
+
+
+def test_score_threshold_and_unknown_sources(store, fake_embeddings):
+    embedding = fake_embeddings.embed_query("how much protein")
+    scores = [score for _, score in filtered_search(store, embedding, k=7, sources={"blog"})]
+    cutoff = scores[3]
+    assert len(filtered_search(store, embedding, k=7, sources={"blog"}, score_threshold=cutoff)) == 4
+    assert filtered_search(store, embedding, k=7, sources={"nope"}) == []
+
+
+def test_fallback_without_selector_support(store, fake_embeddings, monkeypatch):
+    import faiss
+    embedding = fake_embeddings.embed_query("how much protein")
+    expected = filtered_search(store, embedding, k=5, sources={"diet", "Weight"})
+
+    def unsupported(*args, **kwargs):
+        raise RuntimeError("selector not supported")
+    monkeypatch.setattr(faiss, "IDSelectorBitmap", unsupported)
+    assert [doc.id for doc, _ in filtered_search(store, embedding, k=5, sources={"diet", "Weight"})] == \
+        [doc.id for doc, _ in expected]
+
+
+def test_bitmap_is_built_once_per_store(store):
+    bits, allowed = source_bitmap(store, {"blog"})
+    assert allowed == SOURCES.count("blog")
+    assert source_bitmap(store, ["blog"])[0] is bits
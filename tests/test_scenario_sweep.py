@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from meal_planner import MealPlanner
+from scenario_sweep import ScenarioCache, sweep_scenarios
+from weight_planner import WeightPlanner
+
+PROFILE = dict(age=35, gender="female", height_cm=165, present_weight=80, target_weight=68, diet="veg")
+
+
+@pytest.fixture(scope="module")
+def sweep(dataset):
+    return sweep_scenarios(dataset, **PROFILE, weekly_rates=(0.45, 0.5, 1.0), activity_levels=("sedentary", "very"))
+
+
+def test_rows_match_single_simulations(sweep):
+    assert len(sweep) == 6
+    assert sweep.table[["activity", "weekly_loss"]].values.tolist() == [
+        ["sedentary", 0.45], ["sedentary", 0.5], ["sedentary", 1.0], ["very", 0.45], ["very", 0.5], ["very", 1.0]]
+    for i, row in sweep.table.iterrows():
+        planner = WeightPlanner(80, 68, 35, 165, "female", row["activity"], row["weekly_loss"])
+        forecast, target_cal, maintenance_cal = planner.simulate()
+        assert (row["weeks"], row["target_calories"], row["maintenance_calories"]) == \
+               (forecast["Week"].max(), target_cal, maintenance_cal)
+        assert sweep.forecast(i).equals(forecast)
+        assert row["adaptive_weeks"] == np.ceil(planner.simulate_dynamic()[1] / 7)
+
+
+def test_meal_plans_match_planner(sweep, dataset):
+    for i, row in sweep.table.iterrows():
+        planner = MealPlanner(dataset, total_calories=int(row["target_calories"]), diet_type="veg")
+        planner.select_meals()
+        assert sweep.meals(i)["id"].tolist() == planner.selected_meals_df["id"].tolist()
+        assert row["meal_plan_calories"] == round(planner.selected_meals_df["calories"].sum())
+    assert len(sweep.meal_plans) == sweep.table["target_calories"].nunique()
+
+
+def test_feasibility_flags(sweep):
+    table = sweep.table
+    assert (table["below_calorie_floor"] == (table["target_calories"] < 1200)).all()
+    assert not (table["feasible"] & table["below_calorie_floor"]).any()
+    assert (table.loc[table["feasible"], "meal_plan_gap_pct"].abs() <= 10).all()
+
+
+def test_find(sweep):
+    assert sweep.find("very", 0.45) == 3
+    assert sweep.find("very", 0.5 + 1e-12) == 4
+    assert sweep.find("light", 0.5) is None
+
+
+def test_cache_hits_per_profile_and_table(dataset, recipes_df):
+    cache = ScenarioCache(max_entries=2)
+    first = cache.get_or_sweep(dataset, **PROFILE, weekly_rates=[0.5])
+    assert cache.get_or_sweep(dataset, **PROFILE, weekly_rates=(0.5,)) is first
+    assert cache.get_or_sweep(dataset, **dict(PROFILE, exclude_ingredients=["milk"]), weekly_rates=[0.5]) is not first
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_ratio": 1 / 3, "entries": 2}
+
+    from recipe_dataset import RecipeDataset
+    reloaded = RecipeDataset(recipes_df)
+    assert cache.get_or_sweep(reloaded, **PROFILE, weekly_rates=[0.5]) is not first
+    assert cache.stats()["entries"] == 2
+    # The oldest entry was evicted
+    assert cache.get_or_sweep(dataset, **PROFILE, weekly_rates=[0.5]) is not first
@@ -0,0 +1,49 @@
+import numpy as np
+from semantic_cache import SemanticCache, profile_bucket
+from GPTCustomPrompt import GPTCustomPromptPlanner
+
+PROFILE = dict(age=34, gender="Female", height_cm=165, present_weight=72, target_weight=64, calories=1700)
+
+
+def test_lookup_uses_threshold_and_bucket():
+    cache = SemanticCache(threshold=0.95)
+    bucket = profile_bucket(**PROFILE)
+    cache.add([1.0, 0.0, 0.0], bucket, "answer")
+
+    assert cache.lookup([2.0, 0.1, 0.0], bucket) == "answer"
+    assert cache.lookup([1.0, 1.0, 0.0], bucket) is None
+    assert cache.lookup([1.0, 0.0, 0.0], profile_bucket(**dict(PROFILE, target_weight=80))) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_ratio": 1 / 3, "entries": 1, "buckets": 1}
+
+
+def test_similar_profiles_share_a_bucket():
+    assert profile_bucket(**PROFILE) == profile_bucket(**dict(PROFILE, age=36, present_weight=71.5, calories=1720))
+    assert profile_bucket(**PROFILE) != profile_bucket(**dict(PROFILE, gender="male"))
+
+
+def test_least_recently_used_is_evicted_across_buckets():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.add([1.0, 0.0], "a", "first")
+    cache.add([0.0, 1.0], "b", "second")
+    assert cache.lookup([1.0, 0.0], "a") == "first"
+    cache.add([1.0, 1.0], "a", "third")
+
+    assert cache.lookup([0.0, 1.0], "b") is None
+    assert cache.lookup([1.0, 0.0], "a") == "first"
+    assert cache.stats()["buckets"] == 1
+
+
+def test_hit_returns_this_users_prompt():
+    planner = GPTCustomPromptPlanner.__new__(GPTCustomPromptPlanner)
+    planner.semantic_cache = SemanticCache()
+    planner.embed = lambda prompt: np.ones(4)
+    planner.semantic_cache.add(np.ones(4), profile_bucket(**PROFILE), ("Eat more fibre.", ["chunk 1"]))
+
+    prompt, response, summaries = planner.generate("How do I snack better?", **dict(PROFILE, age=36))
+    assert "Age: 36" in prompt
+    assert "How do I snack better?" in prompt
+    assert (response, summaries) == ("Eat more fibre.", ["chunk 1"])
+
+    assert list(planner.generate_stream("Any snack ideas?", **PROFILE)) == ["Eat more fibre."]
+    assert "Any snack ideas?" in planner.prompt
+    assert planner.doc_summaries == ["chunk 1"]
@@ -0,0 +1,76 @@
+import os
+import threading
+import pytest
+import shared_resources
+from conftest import save_store
+
+
+def test_openai_client_is_pooled_per_key(monkeypatch):
+    monkeypatch.setattr(shared_resources, "_openai_clients", {})
+    client = shared_resources.get_openai_client("sk-one")
+    assert shared_resources.get_openai_client("sk-one") is client
+    assert shared_resources.get_openai_client("sk-two") is not client
+
+
+def test_embeddings_spec_comes_from_manifest(tmp_path, fake_embeddings):
+    assert shared_resources.embeddings_spec(tmp_path) == shared_resources.DEFAULT_EMBEDDINGS
+    save_store(tmp_path, fake_embeddings, ["a"], ["diet"])
+    assert shared_resources.embeddings_spec(tmp_path) == "fake"
+    with pytest.raises(ValueError):
+        shared_resources.make_embeddings("nope")
+
+
+def test_vectorstore_is_shared_and_reloaded(tmp_path, fake_embeddings, monkeypatch):
+    save_store(tmp_path, fake_embeddings, ["fruit is healthy", "lift weights"], ["diet", "physical"])
+    store = shared_resources.get_vectorstore(tmp_path)
+    assert store.index.ntotal == 2
+    assert store.embeddings is fake_embeddings
+    assert shared_resources.get_vectorstore(tmp_path) is store
+
+    save_store(tmp_path, fake_embeddings, ["fruit is healthy", "lift weights", "sleep well"], ["diet"] * 3)
+    os.utime(os.path.join(tmp_path, "index.faiss"), (0, 0))
+    assert shared_resources.get_vectorstore(tmp_path) is store
+    monkeypatch.setattr(shared_resources, "RELOAD_CHECK_SECONDS", 0)
+    reloaded = shared_resources.get_vectorstore(tmp_path)
+    assert reloaded is not store
+    assert reloaded.index.ntotal == 3
+
+
+def test_reload_does_not_block_clients(tmp_path, fake_embeddings, monkeypatch):
+    save_store(tmp_path, fake_embeddings, ["a"], ["diet"])
+    loading, release = threading.Event(), threading.Event()
+    load = shared_resources._load_faiss
+
+    def slow_load(*args):
+        loading.set()
+        release.wait(5)
+        return load(*args)
+    monkeypatch.setattr(shared_resources, "_load_faiss", slow_load)
+    monkeypatch.setattr(shared_resources, "_openai_clients", {})
+
+    loader = threading.Thread(target=shared_resources.get_vectorstore, args=(tmp_path,))
+    loader.start()
+    assert loading.wait(5)
+    client = threading.Thread(target=shared_resources.get_openai_client, args=("sk-test",))
+    client.start()
+    client.join(2)
+    assert not client.is_alive()
+    release.set()
+    loader.join(5)
+    assert shared_resources.get_vectorstore(tmp_path).index.ntotal == 1
+
+
+def test_failed_reload_keeps_the_old_store(tmp_path, fake_embeddings, monkeypatch):
+    save_store(tmp_path, fake_embeddings, ["a", "b"], ["diet", "diet"])
+    store = shared_resources.get_vectorstore(tmp_path)
+    monkeypatch.setattr(shared_resources, "RELOAD_CHECK_SECONDS", 0)
+
+    os.remove(os.path.join(tmp_path, "index.pkl"))
+    assert shared_resources.get_vectorstore(tmp_path) is store
+
+    save_store(tmp_path, fake_embeddings, ["a", "b", "c"], ["diet"] * 3)
+    assert shared_resources.get_vectorstore(tmp_path).index.ntotal == 3
+    # No manifest: the default spec is used, so make it resolvable offline
+    monkeypatch.setitem(shared_resources._embeddings, shared_resources.DEFAULT_EMBEDDINGS, fake_embeddings)
+    with pytest.raises(RuntimeError):
+        shared_resources.get_vectorstore(tmp_path / "missing")
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+import pytest
+import shared_resources
+import weight_planner
+from metrics import get_metrics
+from response_cache import ResponseCache
+from weight_planner import WeightPlanner
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeClient:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.requests.append(request)
+        usage = SimpleNamespace(prompt_tokens=40, completion_tokens=len(self.tokens))
+        return iter([chunk(token) for token in self.tokens] + [chunk(usage=usage)])
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = FakeClient(["You ", "can ", "do ", "it!"])
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(shared_resources, "get_openai_client", lambda api_key=None: client)
+    monkeypatch.setattr(weight_planner, "get_response_cache", lambda: cache)
+    return client
+
+
+def test_summary_streams_tokens_then_replays_from_cache(client):
+    calls = get_metrics().snapshot()["llm"].get("gpt-4-turbo", {}).get("calls", 0)
+    planner = WeightPlanner(90, 80, 35, 180, "male")
+    stream = planner.generate_stream()
+    assert next(stream) == "You "
+    assert planner.prompt == planner.summary_prompt()
+    assert list(stream) == ["can ", "do ", "it!"]
+    assert client.requests[0]["stream"] is True
+    assert get_metrics().snapshot()["llm"]["gpt-4-turbo"]["calls"] == calls + 1
+
+    assert list(WeightPlanner(90, 80, 35, 180, "male").generate_stream()) == ["You can do it!"]
+    assert WeightPlanner(90, 80, 35, 180, "male").generate_summary()[1] == "You can do it!"
+    assert len(client.requests) == 1
+
+
+def test_stream_chain_sends_the_stuff_prompt(monkeypatch):
+    messages = [SimpleNamespace(content="context and question")]
+    prompt = SimpleNamespace(format_prompt=lambda **inputs: SimpleNamespace(to_messages=lambda: messages))
+    chain = SimpleNamespace(_get_inputs=lambda docs, question: {"docs": docs, "question": question},
+                            llm_chain=SimpleNamespace(prompt=prompt))
+    sent = []
+    llm = SimpleNamespace(
+        model_name="stub-model",
+        stream=lambda m: sent.append(m) or iter([SimpleNamespace(content=c) for c in ["Walk ", "", "daily."]]),
+        get_num_tokens_from_messages=lambda m: 12, get_num_tokens=lambda text: 3)
+
+    before = get_metrics().snapshot()["llm"].get("stub-model", {"prompt_tokens": 0, "completion_tokens": 0})
+    assert list(shared_resources.stream_chain(llm, chain, ["doc"], "How?")) == ["Walk ", "daily."]
+    assert sent == [messages]
+    usage = get_metrics().snapshot()["llm"]["stub-model"]
+    assert usage["prompt_tokens"] - before["prompt_tokens"] == 12
+    assert usage["completion_tokens"] - before["completion_tokens"] == 3
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from weight_planner import WeightPlanner, simulate_batch, simulate_dynamic_batch, LBS_TO_KG, MIN_WEEKLY_LOSS_LBS
+
+PROFILES = [
+    # present, target, age, height, gender, activity, weekly_lbs
+    (90.0, 70.0, 35, 180, "male", "moderate", 1.0),
+    (70.0, 62.5, 28, 165, "female", "light", 0.5),
+    (55.0, 60.0, 22, 170, "female", "very", 0.7),
+    (100.0, 99.9, 50, 175, "male", "sedentary", 2.0),
+    (80.0, 80.0, 40, 170, "male", "super", 1.0),
+    (85.0, 61.3, 45, 160, "Female", "unknown", 0.9),
+]
+
+
+def simulate_loop(present, target, age, height, gender, activity, weekly_lbs):
+    """The original week-by-week simulation."""
+    planner = WeightPlanner(present, target, age, height, gender, activity, weekly_lbs)
+    factor = planner.activity_factors.get(planner.activity_level, 1.55)
+    maintenance = round(planner.calculate_bmr(target) * factor)
+    adjustment = planner.weekly_change_kg * 7700 / 7
+    daily = maintenance - adjustment if planner.direction == "loss" else maintenance + adjustment
+
+    weight, weights = present, [present]
+    while (planner.direction == "loss" and weight > target) or (planner.direction == "gain" and weight < target):
+        weight -= planner.weekly_change_kg if planner.direction == "loss" else -planner.weekly_change_kg
+        weight = max(weight, target) if planner.direction == "loss" else min(weight, target)
+        weights.append(weight)
+    return np.round(weights, 2), round(daily), maintenance
+
+
+def test_batch_matches_weekly_loop():
+    weights, weeks, target_cal, maintenance_cal = simulate_batch(*map(list, zip(*PROFILES)))
+    for i, profile in enumerate(PROFILES):
+        expected, daily, maintenance = simulate_loop(*profile)
+        assert weeks[i] == len(expected) - 1
+        assert weights[i, :weeks[i] + 1] == pytest.approx(expected, abs=0.011)
+        assert np.isnan(weights[i, weeks[i] + 1:]).all()
+        assert target_cal[i] == daily
+        assert maintenance_cal[i] == maintenance
+
+
+def test_simulate_uses_batch():
+    df, target_cal, maintenance_cal = WeightPlanner(*PROFILES[0]).simulate()
+    expected, daily, maintenance = simulate_loop(*PROFILES[0])
+    assert df["Week"].tolist() == list(range(len(expected)))
+    assert df["Estimated Weight (kg)"].tolist() == pytest.approx(expected.tolist(), abs=0.011)
+    assert (target_cal, maintenance_cal) == (daily, maintenance)
+
+
+@pytest.mark.parametrize("weekly_lbs", [0.0, -1.0, 0.05])
+def test_slow_rates_are_clamped(weekly_lbs):
+    weights, weeks, _, _ = simulate_batch(90, 80, 35, 180, "male", "moderate", weekly_lbs)
+    assert weeks[0] == int(np.ceil(10 / (MIN_WEEKLY_LOSS_LBS * LBS_TO_KG)))
+    assert weights[0, weeks[0]] == 80
+
+
+def simulate_daily_loop(present, target, age, height, gender, activity, intake, days):
+    planner = WeightPlanner(present, target, age, height, gender, activity)
+    factor = planner.activity_factors.get(planner.activity_level, 1.55)
+    weight, weights, reached = present, [present], None
+    for day in range(1, days + 1):
+        weight += (intake - factor * planner.calculate_bmr(weight)) / 7700
+        if reached is None and (weight <= target if target < present else weight >= target):
+            reached = day
+        weights.append(max(weight, target) if target < present else min(weight, target))
+    return np.array(weights), reached
+
+
+@pytest.mark.parametrize("profile", PROFILES[:3])
+def test_dynamic_closed_form_matches_daily_loop(profile):
+    weights, days, days_to_target, intake = simulate_dynamic_batch(*profile, horizon_days=1500)
+    expected, reached = simulate_daily_loop(*profile[:6], intake[0], 1500)
+    assert days.tolist() == list(range(1501))
+    assert weights[0] == pytest.approx(np.round(expected, 2), abs=0.011)
+    assert days_to_target[0] == reached
+
+
+def test_dynamic_intake_defaults_to_linear_plan():
+    _, _, target_cal, _ = simulate_batch(*PROFILES[0])
+    _, _, _, intake = simulate_dynamic_batch(*PROFILES[0])
+    assert intake[0] == target_cal[0]
+
+
+def test_dynamic_never_reaching_target():
+    # Maintenance intake for 80 kg: weight settles at 80 and never reaches 70
+    intake = 1.55 * (10 * 80 + 6.25 * 180 - 5 * 35 + 5)
+    weights, _, days_to_target, _ = simulate_dynamic_batch(90, 70, 35, 180, "male", daily_calories=intake, horizon_days=3000)
+    assert np.isinf(days_to_target[0])
+    assert (weights[0] > 80).all()
+    assert weights[0, -1] == pytest.approx(80, abs=0.05)
+
+
+def test_summary_prompt_uses_shown_forecast():
+    planner = WeightPlanner(*PROFILES[0])
+    forecast, days_to_target = planner.simulate_dynamic()
+    assert forecast["Week"].iloc[-1] == np.ceil(days_to_target / 7)
+    assert f"over {forecast['Week'].max()} weeks" in planner.summary_prompt(forecast)
+    assert f"over {planner.simulate()[0]['Week'].max()} weeks" in planner.summary_prompt()
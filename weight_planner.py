@@ -1,10 +1,121 @@
+import numpy as np
 import pandas as pd
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+import shared_resources
+from metrics import timed, record_usage
+from response_cache import get_response_cache
 
-# Load .env file
-load_dotenv()
+LBS_TO_KG = 0.453592
+KCAL_PER_KG = 7700
+# Slowest weekly change accepted (the API's lower bound); smaller, zero or negative rates are raised to it
+MIN_WEEKLY_LOSS_LBS = 0.1
+ACTIVITY_FACTORS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "very": 1.725,
+    "super": 1.9
+}
+
+
+def _lower(values):
+    return np.char.lower(np.asarray(values, dtype=str))
+
+
+def _broadcast_profiles(present_weight_kg, target_weight_kg, age, height_cm, gender, activity_level, weekly_loss_lbs):
+    arrays = np.broadcast_arrays(
+        np.asarray(present_weight_kg, dtype=float), np.asarray(target_weight_kg, dtype=float),
+        np.asarray(age, dtype=float), np.asarray(height_cm, dtype=float),
+        np.asarray(gender, dtype=str), np.asarray(activity_level, dtype=str), np.asarray(weekly_loss_lbs, dtype=float))
+    arrays = [np.atleast_1d(a).ravel() for a in arrays]
+    arrays[-1] = np.fmax(arrays[-1], MIN_WEEKLY_LOSS_LBS)
+    return arrays
+
+
+##Mifflin:https://www.leighpeele.com/mifflin-st-jeor-calculator
+def bmr_batch(weight_kg, height_cm, age, gender):
+    offset = np.where(_lower(gender) == "male", 5, -161)
+    return 10 * np.asarray(weight_kg, dtype=float) + 6.25 * np.asarray(height_cm, dtype=float) - 5 * np.asarray(age, dtype=float) + offset
+
+
+def activity_factor_batch(activity_level):
+    levels = _lower(activity_level)
+    factors = np.full(levels.shape, ACTIVITY_FACTORS["moderate"])
+    for level, factor in ACTIVITY_FACTORS.items():
+        factors[levels == level] = factor
+    return factors
+
+
+def weeks_to_target(present_weight_kg, target_weight_kg, weekly_loss_lbs):
+    # Closed form of the week-by-week loop: constant steps, last one clipped at the target
+    distance = np.abs(np.asarray(target_weight_kg, dtype=float) - np.asarray(present_weight_kg, dtype=float))
+    weekly_change_kg = np.fmax(np.asarray(weekly_loss_lbs, dtype=float), MIN_WEEKLY_LOSS_LBS) * LBS_TO_KG
+    return np.ceil(distance / weekly_change_kg - 1e-9).clip(min=0).astype(int)
+
+
+def simulate_batch(present_weight_kg, target_weight_kg, age, height_cm, gender, activity_level="moderate", weekly_loss_lbs=1.0):
+    """Vectorized WeightPlanner.simulate over arrays of profiles (scalars broadcast).
+
+    Returns (weights, weeks, target_daily_calories, maintenance_calories) where weights is an
+    (n_profiles, max_weeks + 1) array padded with NaN after each profile reaches its target.
+    """
+    present, target, age, height, gender, activity, weekly_lbs = _broadcast_profiles(
+        present_weight_kg, target_weight_kg, age, height_cm, gender, activity_level, weekly_loss_lbs)
+
+    weekly_change_kg = weekly_lbs * LBS_TO_KG
+    sign = np.where(target < present, -1.0, 1.0)
+
+    maintenance_calories = np.round(bmr_batch(target, height, age, gender) * activity_factor_batch(activity))
+    target_daily_calories = maintenance_calories + sign * weekly_change_kg * KCAL_PER_KG / 7
+
+    weeks = weeks_to_target(present, target, weekly_lbs)
+    steps = np.arange(weeks.max(initial=0) + 1)
+    change = np.minimum(steps[None, :] * weekly_change_kg[:, None], np.abs(target - present)[:, None])
+    weights = np.round(present[:, None] + sign[:, None] * change, 2)
+    weights[steps[None, :] > weeks[:, None]] = np.nan
+
+    return weights, weeks, np.round(target_daily_calories), maintenance_calories
+
+
+def simulate_dynamic_batch(present_weight_kg, target_weight_kg, age, height_cm, gender, activity_level="moderate",
+                           weekly_loss_lbs=1.0, daily_calories=None, horizon_days=3 * 365, step_days=1):
+    """Adaptive forecast: BMR/TDEE follow the current weight every day under a fixed intake.
+
+    The daily update w' = w + (intake - factor * bmr(w)) / 7700 is linear in w, so day t has the
+    closed form w_eq + (w0 - w_eq) * r**t. All profiles and all days are evaluated in one shot.
+    Returns (weights, days, days_to_target, daily_calories); weights is (n_profiles, len(days))
+    and holds at the target once it is reached. days_to_target is inf when it never is.
+    """
+    present, target, age, height, gender, activity, weekly_lbs = _broadcast_profiles(
+        present_weight_kg, target_weight_kg, age, height_cm, gender, activity_level, weekly_loss_lbs)
+    if daily_calories is None:
+        _, _, intake, _ = simulate_batch(present, target, age, height, gender, activity, weekly_lbs)
+    else:
+        intake = np.broadcast_to(np.asarray(daily_calories, dtype=float), present.shape)
+
+    factor = activity_factor_batch(activity)
+    bmr_offset = bmr_batch(0.0, height, age, gender)
+    rate = 1 - 10 * factor / KCAL_PER_KG
+    equilibrium = (intake / factor - bmr_offset) / 10
+
+    days = np.arange(0, horizon_days + 1, step_days)
+    gap = present - equilibrium
+    weights = equilibrium[:, None] + gap[:, None] * rate[:, None] ** days[None, :]
+
+    losing = target < present
+    weights = np.where(losing[:, None], np.maximum(weights, target[:, None]), np.minimum(weights, target[:, None]))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        remaining = (target - equilibrium) / gap
+        days_to_target = np.where((remaining > 0) & (remaining <= 1), np.ceil(np.log(remaining) / np.log(rate)), np.inf)
+    days_to_target[present == target] = 0
+
+    return np.round(weights, 2), days, days_to_target, intake
+
+
+def batch_to_frame(weights, weeks):
+    # Long format: one row per (profile, week), matching simulate()'s column names
+    profile, week = np.nonzero(~np.isnan(weights))
+    return pd.DataFrame({"Profile": profile, "Week": week, "Estimated Weight (kg)": weights[profile, week]})
 
 
 class WeightPlanner:
@@ -16,15 +127,9 @@ class WeightPlanner:
         self.gender = gender.lower()
         self.activity_level = activity_level.lower()
         self.weekly_loss_lbs = weekly_loss_lbs
-        self.weekly_change_kg = weekly_loss_lbs * 0.453592
+        self.weekly_change_kg = weekly_loss_lbs * LBS_TO_KG
         self.direction = "loss" if target_weight_kg < present_weight_kg else "gain"
-        self.activity_factors = {
-            "sedentary": 1.2,
-            "light": 1.375,
-            "moderate": 1.55,
-            "very": 1.725,
-            "super": 1.9
-        }
+        self.activity_factors = ACTIVITY_FACTORS
 ##Mifflin:https://www.leighpeele.com/mifflin-st-jeor-calculator
     def calculate_bmr(self, weight_kg):
         if self.gender == "male":
@@ -32,49 +137,79 @@ class WeightPlanner:
         else:
             return 10 * weight_kg + 6.25 * self.height_cm - 5 * self.age - 161
 
+    @timed("weight.simulate")
     def simulate(self):
-        activity_factor = self.activity_factors.get(self.activity_level, 1.55)
-        target_bmr = self.calculate_bmr(self.target_weight_kg)
-        maintenance_calories = round(target_bmr * activity_factor)
-
-        weekly_kcal_change = self.weekly_change_kg * 7700
-        daily_kcal_adjustment = weekly_kcal_change / 7
+        weights, weeks, target_cal, maintenance_cal = simulate_batch(
+            self.present_weight_kg, self.target_weight_kg, self.age, self.height_cm,
+            self.gender, self.activity_level, self.weekly_loss_lbs)
 
-        if self.direction == "loss":
-            target_daily_calories = maintenance_calories - daily_kcal_adjustment
-        else:
-            target_daily_calories = maintenance_calories + daily_kcal_adjustment
+        weekly_data = pd.DataFrame({
+            "Week": np.arange(weeks[0] + 1),
+            "Estimated Weight (kg)": weights[0, :weeks[0] + 1]
+        })
+        return weekly_data, int(target_cal[0]), int(maintenance_cal[0])
 
-        weight = self.present_weight_kg
-        weekly_data = [{"Week": 0, "Estimated Weight (kg)": round(weight, 2)}]
-        week = 1
+    @timed("weight.simulate_dynamic")
+    def simulate_dynamic(self, horizon_days=3 * 365):
+        weights, days, days_to_target, _ = simulate_dynamic_batch(
+            self.present_weight_kg, self.target_weight_kg, self.age, self.height_cm,
+            self.gender, self.activity_level, self.weekly_loss_lbs, horizon_days=horizon_days, step_days=7)
 
-        while (self.direction == "loss" and weight > self.target_weight_kg) or \
-              (self.direction == "gain" and weight < self.target_weight_kg):
-            weight -= self.weekly_change_kg if self.direction == "loss" else -self.weekly_change_kg
-            weight = max(weight, self.target_weight_kg) if self.direction == "loss" else min(weight, self.target_weight_kg)
-            weekly_data.append({"Week": week, "Estimated Weight (kg)": round(weight, 2)})
-            week += 1
+        # Show the curve until the target is reached (or the horizon runs out)
+        last_week = int(min(np.ceil(days_to_target[0] / 7), len(days) - 1))
+        return pd.DataFrame({
+            "Week": days[:last_week + 1] // 7,
+            "Estimated Weight (kg)": weights[0, :last_week + 1]
+        }), days_to_target[0]
 
-        return pd.DataFrame(weekly_data), round(target_daily_calories), round(maintenance_calories)
+    def summary_prompt(self, forecast=None):
+        # forecast: the Week/weight frame shown to the user (e.g. from simulate_dynamic); linear by default
+        df = forecast if forecast is not None else self.simulate()[0]
+        total_weeks = int(df['Week'].max())
 
-    def generate_summary(self):
-        df, target_cal, maintenance_cal = self.simulate()
-        total_weeks = df['Week'].max()
-
-        prompt = (
+        return (
             f"A user wants to go from {self.present_weight_kg} kg to {self.target_weight_kg} kg "
             f"over {total_weeks} weeks. The goal is to create an inspiring and friendly summary "
             f"that briefly motivates the user with 2–3 sentences. Be supportive and positive."
         )
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=100
-        )
+    @timed("weight.summary")
+    def generate_summary(self, forecast=None):
+        prompt = self.summary_prompt(forecast)
 
-        summary = response.choices[0].message.content.strip()
+        def call():
+            client = shared_resources.get_openai_client()
+            response = client.chat.completions.create(
+                model="gpt-4-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=100
+            )
+            record_usage("gpt-4-turbo", response.usage)
+            return response.choices[0].message.content.strip()
+
+        cache = get_response_cache()
+        summary = cache.get_or_call(cache.make_key("gpt-4-turbo", prompt, max_tokens=100), call)
 
         return prompt,summary
+
+    @timed("weight.summary_stream")
+    def generate_stream(self, forecast=None):
+        # Yields summary tokens as they arrive; self.prompt is set before the first one
+        prompt = self.prompt = self.summary_prompt(forecast)
+
+        def stream():
+            client = shared_resources.get_openai_client()
+            for chunk in client.chat.completions.create(
+                model="gpt-4-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=100,
+                stream=True,
+                stream_options={"include_usage": True}
+            ):
+                if chunk.usage:
+                    record_usage("gpt-4-turbo", chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        cache = get_response_cache()
+        yield from cache.cached_stream(cache.make_key("gpt-4-turbo", prompt, max_tokens=100), stream)